@@ -0,0 +1,712 @@
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from money import sum_reais
+from object_store import PreconditionFailed, get_object_store
+
+# Backend das contas: 'journal' (accounts.json + diário de alterações no bucket), 'sharded'
+# (um snapshot + diário por titular e um manifesto; exige scripts/migrate_account_shards.py),
+# 's3' (só o accounts.json, regravado a cada alteração), 'sqlite' (arquivo local) ou 'memory'
+ACCOUNT_STORE_BACKEND = os.environ.get('ACCOUNT_STORE', 'journal')
+ACCOUNTS_BUCKET = os.environ.get('ACCOUNTS_BUCKET', 'dindin-ofx-files')
+ACCOUNTS_KEY = os.environ.get('ACCOUNTS_KEY', 'accounts.json')
+ACCOUNTS_DB_PATH = os.environ.get('ACCOUNTS_DB_PATH', 'accounts.db')
+
+# Escritas concorrentes no accounts.json: tentativas e espera base entre elas (com jitter)
+ACCOUNTS_MAX_ATTEMPTS = int(os.environ.get('ACCOUNTS_MAX_ATTEMPTS', '6'))
+ACCOUNTS_RETRY_BASE_SECONDS = float(os.environ.get('ACCOUNTS_RETRY_BASE_SECONDS', '0.02'))
+
+# Diário de alterações: prefixo dos registros, tamanho do diário que dispara a compactação
+# e downloads simultâneos ao ler registros novos
+ACCOUNTS_JOURNAL_PREFIX = os.environ.get('ACCOUNTS_JOURNAL_PREFIX', 'accounts/journal/')
+ACCOUNTS_COMPACT_THRESHOLD = int(os.environ.get('ACCOUNTS_COMPACT_THRESHOLD', '50'))
+ACCOUNTS_JOURNAL_READ_WORKERS = 16
+
+# Contas por titular: manifesto com os shards e os seus totais, e prefixo dos shards.
+# ACCOUNT_TITULARES são os titulares dos backends sem manifesto, e os do sharded enquanto
+# o manifesto ainda não existe
+ACCOUNTS_MANIFEST_KEY = os.environ.get('ACCOUNTS_MANIFEST_KEY', 'accounts/manifest.json')
+ACCOUNTS_SHARDS_PREFIX = os.environ.get('ACCOUNTS_SHARDS_PREFIX', 'accounts/shards/')
+ACCOUNT_TITULARES = [t for t in os.environ.get('ACCOUNT_TITULARES', 'ricardo,priscila').split(',') if t]
+
+# O titular vira parte da chave do shard
+TITULAR_PATTERN = re.compile(r'^[a-z0-9_-]+$')
+
+
+class AccountConflictError(Exception):
+    """
+    A alteração não foi gravada: outras escritas concorrentes venceram todas as tentativas.
+    """
+
+
+def apply_changes(account, changes):
+    """
+    Conta com os campos alterados; o id nunca muda.
+    """
+    updated = dict(account)
+    updated.update(changes)
+    updated['id'] = account['id']
+    return updated
+
+
+def backfill_account_ids(store, key=ACCOUNTS_KEY):
+    """
+    Adiciona ids às contas de um accounts.json antigo que não os têm. Os stores indexam pelo
+    id e não conseguem ler esse arquivo, então nenhuma outra escrita pode tê-lo alterado;
+    a gravação ainda é condicional ao ETag lido. Retorna quantos ids foram criados.
+    """
+    data, etag = store.get_if_changed(key)
+    if data is None:
+        return 0
+    accounts_data = json.loads(data)
+    missing = [account for account in accounts_data.get('accounts', []) if 'id' not in account]
+    for account in missing:
+        account['id'] = str(uuid.uuid4())
+    if missing:
+        store.put(key, json.dumps(accounts_data, indent=2, ensure_ascii=False),
+                  content_type='application/json', if_match=etag)
+    return len(missing)
+
+
+def run_operation(store, operation):
+    """
+    Aplica uma operação já validada ({'op': 'create', 'account'}, {'op': 'update', 'id', 'changes'}
+    ou {'op': 'delete', 'id'}) e retorna o seu resultado, com o status HTTP correspondente.
+    """
+    kind = operation['op']
+    if kind == 'create':
+        account = store.create(operation['account'])
+        return {'op': kind, 'id': account['id'], 'status': 201, 'account': account}
+
+    if kind == 'update':
+        account = store.update(operation['id'], operation['changes'])
+    else:
+        account = store.delete(operation['id'])
+    if account is None:
+        return {'op': kind, 'id': operation['id'], 'status': 404, 'error': 'Conta não encontrada'}
+    return {'op': kind, 'id': operation['id'], 'status': 200, 'account': account}
+
+
+class AccountStore(ABC):
+    """
+    Armazenamento de contas com acesso pelo id (índice id -> conta), na ordem de criação.
+    Os backends implementam list_accounts, get, create, update e delete.
+    """
+
+    def titulares(self):
+        """
+        Titulares aceitos nas contas.
+        """
+        return list(ACCOUNT_TITULARES)
+
+    def apply_batch(self, operations):
+        """
+        Aplica as operações em ordem e retorna o resultado de cada uma.
+        """
+        return [run_operation(self, operation) for operation in operations]
+
+    @abstractmethod
+    def list_accounts(self, titular=None):
+        """
+        Contas na ordem de criação, opcionalmente só as do titular.
+        """
+
+    @abstractmethod
+    def get(self, account_id):
+        """
+        Retorna a conta, ou None se ela não existir.
+        """
+
+    @abstractmethod
+    def create(self, account):
+        """
+        Grava a conta nova (já com o id) e a retorna.
+        """
+
+    @abstractmethod
+    def update(self, account_id, changes):
+        """
+        Aplica `changes` à conta e retorna a conta atualizada, ou None se ela não existir.
+        """
+
+    @abstractmethod
+    def delete(self, account_id):
+        """
+        Remove a conta e a retorna, ou None se ela não existir.
+        """
+
+
+class InMemoryAccountStore(AccountStore):
+    """
+    Contas em um dicionário id -> conta (o dicionário preserva a ordem de criação).
+    """
+
+    def __init__(self, accounts=()):
+        self.index = {account['id']: account for account in accounts}
+
+    def list_accounts(self, titular=None):
+        return [account for account in self.index.values() if titular is None or account.get('titular') == titular]
+
+    def get(self, account_id):
+        return self.index.get(account_id)
+
+    def create(self, account):
+        self.index[account['id']] = account
+        return account
+
+    def update(self, account_id, changes):
+        account = self.index.get(account_id)
+        if account is None:
+            return None
+        self.index[account_id] = apply_changes(account, changes)
+        return self.index[account_id]
+
+    def delete(self, account_id):
+        return self.index.pop(account_id, None)
+
+
+class S3JsonAccountStore(AccountStore):
+    """
+    Contas no accounts.json do bucket ({'accounts': [...]}, o formato lido pelo app).
+    O índice id -> conta fica em memória no container e é revalidado a cada acesso com um
+    GET condicional pelo ETag: enquanto o arquivo não muda, nada é baixado. Cada alteração
+    ainda regrava o arquivo inteiro.
+    As escritas são condicionais ao ETag lido (concorrência otimista): se outra escrita chegou
+    antes, o arquivo é relido e a alteração reaplicada, com espera aleatória entre tentativas.
+    """
+
+    def __init__(self, store, key=ACCOUNTS_KEY, max_attempts=ACCOUNTS_MAX_ATTEMPTS,
+                 retry_base_seconds=ACCOUNTS_RETRY_BASE_SECONDS):
+        self.store = store
+        self.key = key
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.etag = None
+        self.index = {}
+        self.conflicts = 0
+
+    def load(self):
+        data, etag = self.store.get_if_changed(self.key, self.etag)
+        if data is not None:
+            self.index = {account['id']: account for account in json.loads(data).get('accounts', [])}
+        elif etag is None:
+            self.index = {}
+        self.etag = etag
+        return self.index
+
+    def save(self):
+        """
+        Grava o índice se o arquivo ainda for a versão lida (If-Match), ou se ainda não
+        existir (If-None-Match). Lança PreconditionFailed se outra escrita chegou antes.
+        """
+        body = json.dumps({'accounts': list(self.index.values())}, indent=2)
+        if self.etag:
+            self.etag = self.store.put(self.key, body, content_type='application/json', if_match=self.etag)
+        else:
+            self.etag = self.store.put(self.key, body, content_type='application/json', if_none_match='*')
+
+    def mutate(self, change):
+        """
+        Aplica `change(índice)` sobre a versão atual do arquivo e grava. Em conflito, relê
+        o arquivo e reaplica a alteração, até max_attempts vezes, esperando um tempo
+        aleatório (backoff exponencial com jitter) para dessincronizar os concorrentes.
+        Retorna o resultado de `change`; se ele for None, nada é gravado.
+        """
+        for attempt in range(self.max_attempts):
+            result = change(self.load())
+            if result is None:
+                return None
+            try:
+                self.save()
+                return result
+            except PreconditionFailed:
+                self.conflicts += 1
+            except Exception:
+                # O índice em memória pode não refletir o arquivo: força a releitura
+                self.etag = None
+                raise
+            # O índice foi alterado sem ser gravado: a próxima leitura baixa o arquivo inteiro
+            self.etag = None
+            time.sleep(random.uniform(0, self.retry_base_seconds * 2 ** attempt))
+        raise AccountConflictError(f"{self.key} alterado por outras escritas em {self.max_attempts} tentativas")
+
+    def list_accounts(self, titular=None):
+        return [account for account in self.load().values() if titular is None or account.get('titular') == titular]
+
+    def get(self, account_id):
+        return self.load().get(account_id)
+
+    def create(self, account):
+        def change(index):
+            index[account['id']] = account
+            return account
+        return self.mutate(change)
+
+    def update(self, account_id, changes):
+        def change(index):
+            account = index.get(account_id)
+            if account is None:
+                return None
+            index[account_id] = apply_changes(account, changes)
+            return index[account_id]
+        return self.mutate(change)
+
+    def delete(self, account_id):
+        return self.mutate(lambda index: index.pop(account_id, None))
+
+    def apply_batch(self, operations):
+        """
+        Aplica todas as operações sobre o índice e grava o arquivo uma única vez.
+        """
+        def change(index):
+            view = InMemoryAccountStore()
+            view.index = index
+            return [run_operation(view, operation) for operation in operations]
+        return self.mutate(change)
+
+
+class JournaledAccountStore(AccountStore):
+    """
+    Contas no accounts.json (o snapshot compactado) mais um diário de alterações pendentes:
+    cada alteração, ou lote, é um registro pequeno em `prefix` numerado em sequência
+    (000000000001.json, ...), com as operações já validadas. O custo da escrita não depende
+    do número de contas.
+    O estado é o snapshot com os registros posteriores ao seu `journalSeq` aplicados em ordem;
+    o container guarda esse estado e, a cada acesso, revalida o snapshot pelo ETag e baixa só
+    os registros novos.
+    O número de sequência é reservado com PUT condicional (If-None-Match: *): se outra escrita
+    ocupou o número, o registro dela é lido e as operações revalidadas contra o novo estado.
+    compact() incorpora o diário a um novo snapshot. Os registros só são apagados na
+    compactação seguinte, para que leitores e escritores com uma visão anterior ao snapshot
+    novo não percam registros nem reutilizem os seus números.
+    """
+
+    def __init__(self, store, key=ACCOUNTS_KEY, prefix=ACCOUNTS_JOURNAL_PREFIX, max_attempts=ACCOUNTS_MAX_ATTEMPTS,
+                 retry_base_seconds=ACCOUNTS_RETRY_BASE_SECONDS):
+        self.store = store
+        self.key = key
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.etag = None
+        self.snapshot_seq = 0
+        self.seq = 0
+        self.index = {}
+        self.conflicts = 0
+
+    def journal_key(self, seq):
+        return f"{self.prefix}{seq:012d}.json"
+
+    def load_snapshot(self):
+        """
+        Revalida o snapshot pelo ETag. Se ele mudou, o estado volta a ser o do snapshot.
+        """
+        data, etag = self.store.get_if_changed(self.key, self.etag)
+        if data is not None or etag is None:
+            snapshot = json.loads(data) if data is not None else {}
+            self.index = {account['id']: account for account in snapshot.get('accounts', [])}
+            self.snapshot_seq = self.seq = snapshot.get('journalSeq', 0)
+        self.etag = etag
+
+    def read_records(self, keys):
+        if len(keys) <= 1:
+            return [self.store.get(key) for key in keys]
+        with ThreadPoolExecutor(min(len(keys), ACCOUNTS_JOURNAL_READ_WORKERS)) as pool:
+            return list(pool.map(self.store.get, keys))
+
+    def load(self):
+        """
+        Estado atual: o snapshot com os registros do diário posteriores a ele.
+        """
+        self.load_snapshot()
+        keys = list(self.store.list_keys(self.prefix, start_after=self.journal_key(self.seq)))
+        view = InMemoryAccountStore()
+        view.index = self.index
+        for key, data in zip(keys, self.read_records(keys)):
+            if data is None:
+                # Registro apagado por uma compactação: o snapshot em memória está defasado
+                self.etag = None
+                return self.load()
+            record = json.loads(data)
+            for operation in record['operations']:
+                run_operation(view, operation)
+            self.seq = record['seq']
+        return self.index
+
+    def append(self, operations):
+        """
+        Aplica as operações ao estado atual e grava as que tiveram efeito em um único
+        registro do diário. Em conflito pelo número de sequência, relê o diário e reaplica,
+        com backoff exponencial e jitter, até max_attempts vezes.
+        Retorna o resultado de cada operação.
+        """
+        for attempt in range(self.max_attempts):
+            view = InMemoryAccountStore()
+            view.index = self.load()
+            results = [run_operation(view, operation) for operation in operations]
+            applied = [operation for operation, result in zip(operations, results) if result['status'] < 400]
+            if not applied:
+                return results
+
+            seq = self.seq + 1
+            record = {'seq': seq, 'at': datetime.now(timezone.utc).isoformat(), 'operations': applied}
+            try:
+                self.store.put(self.journal_key(seq), json.dumps(record), content_type='application/json',
+                               if_none_match='*')
+                self.seq = seq
+                return results
+            except PreconditionFailed:
+                self.conflicts += 1
+            except Exception:
+                self.etag = None
+                raise
+            # O estado foi alterado sem o registro ter sido gravado: a próxima leitura parte do snapshot
+            self.etag = None
+            time.sleep(random.uniform(0, self.retry_base_seconds * 2 ** attempt))
+        raise AccountConflictError(f"{self.prefix} alterado por outras escritas em {self.max_attempts} tentativas")
+
+    def compact(self, threshold=ACCOUNTS_COMPACT_THRESHOLD):
+        """
+        Grava um novo snapshot com o estado atual se o diário tiver ao menos `threshold`
+        registros pendentes, e apaga os registros já incorporados pela compactação anterior.
+        Retorna um resumo para o log.
+        """
+        self.load()
+        pending = self.seq - self.snapshot_seq
+        if pending == 0 or pending < threshold:
+            return {'compacted': False, 'pending': pending, 'journalSeq': self.snapshot_seq}
+
+        previous_seq = self.snapshot_seq
+        body = json.dumps({'accounts': list(self.index.values()), 'journalSeq': self.seq}, indent=2)
+        try:
+            if self.etag:
+                self.etag = self.store.put(self.key, body, content_type='application/json', if_match=self.etag)
+            else:
+                self.etag = self.store.put(self.key, body, content_type='application/json', if_none_match='*')
+        except PreconditionFailed:
+            # Outra compactação gravou o snapshot antes
+            self.etag = None
+            return {'compacted': False, 'pending': pending, 'journalSeq': previous_seq}
+        self.snapshot_seq = self.seq
+
+        removed = 0
+        for key in list(self.store.list_keys(self.prefix)):
+            if key > self.journal_key(previous_seq):
+                break
+            self.store.delete(key)
+            removed += 1
+        return {'compacted': True, 'pending': pending, 'journalSeq': self.seq, 'removed': removed}
+
+    def list_accounts(self, titular=None):
+        return [account for account in self.load().values() if titular is None or account.get('titular') == titular]
+
+    def get(self, account_id):
+        return self.load().get(account_id)
+
+    def create(self, account):
+        return self.append([{'op': 'create', 'account': account}])[0]['account']
+
+    def update(self, account_id, changes):
+        return self.append([{'op': 'update', 'id': account_id, 'changes': changes}])[0].get('account')
+
+    def delete(self, account_id):
+        return self.append([{'op': 'delete', 'id': account_id}])[0].get('account')
+
+    def apply_batch(self, operations):
+        """
+        Aplica todas as operações e grava um único registro no diário.
+        """
+        return self.append(operations)
+
+
+def shard_entry(titular, prefix=ACCOUNTS_SHARDS_PREFIX):
+    """
+    Entrada do manifesto para um shard novo (vazio) do titular.
+    """
+    if not TITULAR_PATTERN.match(titular):
+        raise ValueError(f"Titular inválido para um shard: {titular!r}")
+    return {
+        'titular': titular,
+        'key': f"{prefix}{titular}/accounts.json",
+        'journalPrefix': f"{prefix}{titular}/journal/",
+        'count': 0,
+        'balance': 0.0,
+        'journalSeq': 0
+    }
+
+
+class ShardedAccountStore(AccountStore):
+    """
+    Contas separadas por titular: cada shard é um JournaledAccountStore com o seu snapshot e
+    o seu diário, e o manifesto (`accounts/manifest.json`) lista os shards com a quantidade
+    de contas e o saldo total de cada um. Os titulares aceitos são os do manifesto.
+    A listagem de um titular lê só o shard dele; sem filtro, e nas buscas pelo id, os shards
+    são lidos em paralelo. As escritas vão para o diário do shard da conta; os totais do
+    manifesto são atualizados pela compactação.
+    """
+
+    def __init__(self, store, manifest_key=ACCOUNTS_MANIFEST_KEY, max_attempts=ACCOUNTS_MAX_ATTEMPTS,
+                 retry_base_seconds=ACCOUNTS_RETRY_BASE_SECONDS):
+        self.store = store
+        self.manifest_key = manifest_key
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.manifest_etag = None
+        self.manifest = None
+        self.shards = {}
+
+    def load_manifest(self):
+        """
+        Revalida o manifesto pelo ETag. Sem manifesto, os shards são os de ACCOUNT_TITULARES,
+        no layout padrão; ele é gravado na primeira compactação.
+        """
+        data, etag = self.store.get_if_changed(self.manifest_key, self.manifest_etag)
+        if data is not None:
+            self.manifest = json.loads(data)
+        elif etag is None:
+            self.manifest = {'shards': [shard_entry(titular) for titular in ACCOUNT_TITULARES]}
+        self.manifest_etag = etag
+
+        for entry in self.manifest['shards']:
+            shard = self.shards.get(entry['titular'])
+            if shard is None or shard.key != entry['key']:
+                self.shards[entry['titular']] = JournaledAccountStore(
+                    self.store, entry['key'], entry['journalPrefix'], self.max_attempts, self.retry_base_seconds
+                )
+        return self.manifest
+
+    def save_manifest(self, manifest):
+        """
+        Grava o manifesto se ele ainda for a versão lida. Lança PreconditionFailed se outra
+        escrita chegou antes.
+        """
+        body = json.dumps(manifest, indent=2)
+        if self.manifest_etag:
+            etag = self.store.put(self.manifest_key, body, content_type='application/json', if_match=self.manifest_etag)
+        else:
+            etag = self.store.put(self.manifest_key, body, content_type='application/json', if_none_match='*')
+        self.manifest = manifest
+        self.manifest_etag = etag
+
+    def titulares(self):
+        return [entry['titular'] for entry in self.load_manifest()['shards']]
+
+    def shard(self, titular):
+        """
+        Shard do titular, ou None se ele não estiver no manifesto.
+        """
+        return self.shards[titular] if titular in self.titulares() else None
+
+    def load_shards(self, shards=None):
+        """
+        Lê os shards (por padrão, os do manifesto) em paralelo. Retorna [(shard, índice)], na
+        ordem do manifesto.
+        """
+        shards = list(shards) if shards is not None else [self.shards[titular] for titular in self.titulares()]
+        if len(shards) <= 1:
+            return [(shard, shard.load()) for shard in shards]
+        with ThreadPoolExecutor(len(shards)) as pool:
+            return list(zip(shards, pool.map(lambda shard: shard.load(), shards)))
+
+    def find(self, account_id):
+        """
+        Retorna (shard, conta) da conta com o id, ou (None, None) se ela não existir.
+        """
+        for shard, index in self.load_shards():
+            if account_id in index:
+                return shard, index[account_id]
+        return None, None
+
+    def list_accounts(self, titular=None):
+        if titular is not None:
+            shard = self.shard(titular)
+            return shard.list_accounts() if shard else []
+        return [account for _, index in self.load_shards() for account in index.values()]
+
+    def get(self, account_id):
+        return self.find(account_id)[1]
+
+    def target_shard(self, titular):
+        shard = self.shard(titular)
+        if shard is None:
+            raise ValueError(f"Titular sem shard no manifesto de contas: {titular}")
+        return shard
+
+    def create(self, account):
+        return self.target_shard(account.get('titular')).create(account)
+
+    def update(self, account_id, changes):
+        shard, account = self.find(account_id)
+        if shard is None:
+            return None
+        if changes.get('titular', account.get('titular')) == account.get('titular'):
+            return shard.update(account_id, changes)
+
+        # Troca de titular: a conta passa para o shard do novo titular. A gravação no destino
+        # vem antes da remoção na origem: se a remoção falhar, a conta fica duplicada, mas não se perde
+        moved = self.target_shard(changes['titular']).create(apply_changes(account, changes))
+        shard.delete(account_id)
+        return moved
+
+    def delete(self, account_id):
+        shard, _ = self.find(account_id)
+        return shard.delete(account_id) if shard else None
+
+    def apply_batch(self, operations):
+        """
+        Agrupa as operações pelo shard da conta e grava um registro no diário de cada shard
+        alterado. Lotes com troca de titular são aplicados uma operação por vez.
+        """
+        shards = {titular: self.shards[titular] for titular in self.titulares()}
+        owners = {account_id: shard for shard, index in self.load_shards(shards.values()) for account_id in index}
+        results = [None] * len(operations)
+        groups = {}
+        for i, operation in enumerate(operations):
+            if operation['op'] == 'create':
+                titular = operation['account'].get('titular')
+                if titular not in shards:
+                    raise ValueError(f"Titular sem shard no manifesto de contas: {titular}")
+                shard = shards[titular]
+                owners[operation['account']['id']] = shard
+            else:
+                shard = owners.get(operation['id'])
+                titular = operation.get('changes', {}).get('titular')
+                if shard is not None and titular is not None and shards.get(titular) is not shard:
+                    return super().apply_batch(operations)
+            if shard is None:
+                # Conta inexistente: o resultado é o 404 da operação em um store vazio
+                results[i] = run_operation(InMemoryAccountStore(), operation)
+                continue
+            groups.setdefault(shard.key, (shard, []))[1].append(i)
+
+        for shard, positions in groups.values():
+            for i, result in zip(positions, shard.apply_batch([operations[i] for i in positions])):
+                results[i] = result
+        return results
+
+    def add_titular(self, titular):
+        """
+        Cadastra um titular, com um shard vazio, no manifesto.
+        """
+        manifest = self.load_manifest()
+        if titular in self.titulares():
+            return False
+        self.save_manifest(dict(manifest, shards=manifest['shards'] + [shard_entry(titular)]))
+        self.load_manifest()
+        return True
+
+    def compact(self, threshold=ACCOUNTS_COMPACT_THRESHOLD):
+        """
+        Compacta o diário de cada shard e atualiza no manifesto a quantidade de contas, o
+        saldo total e o último registro do diário refletido em cada shard.
+        Retorna um resumo para o log.
+        """
+        manifest = self.load_manifest()
+        summaries = {}
+        entries = []
+        for entry in manifest['shards']:
+            shard = self.shards[entry['titular']]
+            summaries[entry['titular']] = shard.compact(threshold)
+            accounts = list(shard.index.values())
+            entries.append(dict(
+                entry,
+                count=len(accounts),
+                balance=sum_reais(account.get('balance') or 0 for account in accounts),
+                journalSeq=shard.seq
+            ))
+
+        updated = entries != manifest['shards'] or self.manifest_etag is None
+        if updated:
+            try:
+                self.save_manifest(dict(
+                    manifest, shards=entries, updatedAt=datetime.now(timezone.utc).isoformat()
+                ))
+            except PreconditionFailed:
+                # Manifesto alterado (titular novo): os totais ficam para a próxima compactação
+                self.manifest_etag = None
+                updated = False
+        return {'shards': summaries, 'manifestUpdated': updated}
+
+
+class SqliteAccountStore(AccountStore):
+    """
+    Contas em SQLite para desenvolvimento local: id como chave primária e índice por titular.
+    """
+
+    def __init__(self, path=ACCOUNTS_DB_PATH):
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS accounts (id TEXT PRIMARY KEY, titular TEXT, data TEXT NOT NULL)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS accounts_titular ON accounts (titular)')
+
+    def list_accounts(self, titular=None):
+        if titular is None:
+            rows = self.connection.execute('SELECT data FROM accounts ORDER BY rowid')
+        else:
+            rows = self.connection.execute('SELECT data FROM accounts WHERE titular = ? ORDER BY rowid', (titular,))
+        return [json.loads(data) for data, in rows]
+
+    def get(self, account_id):
+        row = self.connection.execute('SELECT data FROM accounts WHERE id = ?', (account_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create(self, account):
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO accounts (id, titular, data) VALUES (?, ?, ?)',
+                (account['id'], account.get('titular'), json.dumps(account))
+            )
+        return account
+
+    def update(self, account_id, changes):
+        with self.connection:
+            account = self.get(account_id)
+            if account is None:
+                return None
+            account = apply_changes(account, changes)
+            self.connection.execute(
+                'UPDATE accounts SET titular = ?, data = ? WHERE id = ?',
+                (account.get('titular'), json.dumps(account), account_id)
+            )
+        return account
+
+    def delete(self, account_id):
+        with self.connection:
+            account = self.get(account_id)
+            if account is not None:
+                self.connection.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
+        return account
+
+
+# Estado do container: o store (e o índice do S3) é reaproveitado entre invocações
+_state = {'store': None}
+
+
+def get_account_store():
+    """
+    Retorna o store de contas do backend configurado em ACCOUNT_STORE.
+    """
+    if _state['store'] is None:
+        if ACCOUNT_STORE_BACKEND == 'sqlite':
+            _state['store'] = SqliteAccountStore(ACCOUNTS_DB_PATH)
+        elif ACCOUNT_STORE_BACKEND == 'memory':
+            _state['store'] = InMemoryAccountStore()
+        elif ACCOUNT_STORE_BACKEND == 'sharded':
+            _state['store'] = ShardedAccountStore(get_object_store(ACCOUNTS_BUCKET), ACCOUNTS_MANIFEST_KEY)
+        elif ACCOUNT_STORE_BACKEND == 'journal':
+            _state['store'] = JournaledAccountStore(get_object_store(ACCOUNTS_BUCKET), ACCOUNTS_KEY)
+        elif ACCOUNT_STORE_BACKEND == 's3':
+            _state['store'] = S3JsonAccountStore(get_object_store(ACCOUNTS_BUCKET), ACCOUNTS_KEY)
+        else:
+            raise ValueError(f"Backend de contas desconhecido: {ACCOUNT_STORE_BACKEND}")
+    return _state['store']
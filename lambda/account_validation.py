@@ -0,0 +1,73 @@
+import uuid
+
+from money import to_cents, to_reais
+
+REQUIRED_FIELDS = ('name', 'balance', 'category', 'type', 'icon', 'titular')
+
+# Campos que podem ser alterados; o id nunca muda
+UPDATABLE_FIELDS = ('name', 'balance', 'category', 'type', 'icon', 'titular')
+
+BALANCE_ERROR = 'Campo balance deve ser um valor numérico'
+
+
+def titular_error(titulares):
+    """
+    Mensagem para um titular fora da lista (os titulares vêm do manifesto de contas).
+    """
+    names = [f'"{titular}"' for titular in titulares]
+    if not names:
+        return 'Nenhum titular cadastrado no manifesto de contas'
+    if len(names) == 1:
+        return f'Campo titular deve ser {names[0]}'
+    return f'Campo titular deve ser {", ".join(names[:-1])} ou {names[-1]}'
+
+
+def normalize_balance(value):
+    """
+    Saldo convertido para centavos exatos, sem passar por float, e devolvido em reais.
+    """
+    try:
+        return to_reais(to_cents(value))
+    except ValueError:
+        raise ValueError(BALANCE_ERROR)
+
+
+def validate_new_account(body, titulares):
+    """
+    Monta a nova conta (com id gerado) a partir do corpo da criação, com um dos `titulares`.
+    Lança ValueError com a mensagem para o cliente se algum campo for inválido.
+    """
+    if not isinstance(body, dict):
+        raise ValueError('Conta deve ser um objeto')
+    for field in REQUIRED_FIELDS:
+        if field not in body:
+            raise ValueError(f'Campo obrigatório ausente: {field}')
+    if body['titular'] not in titulares:
+        raise ValueError(titular_error(titulares))
+
+    return {
+        'id': str(uuid.uuid4()),
+        'name': body['name'],
+        'balance': normalize_balance(body['balance']),
+        'category': body['category'],
+        'type': body['type'],
+        'icon': body['icon'],
+        'titular': body['titular']
+    }
+
+
+def validate_account_changes(body, titulares):
+    """
+    Campos alterados de uma conta, com titular em minúsculas e saldo normalizado.
+    Lança ValueError com a mensagem para o cliente se algum campo for inválido.
+    """
+    if not isinstance(body, dict):
+        raise ValueError('Conta deve ser um objeto')
+    changes = {field: body[field] for field in UPDATABLE_FIELDS if field in body}
+    if 'titular' in changes:
+        changes['titular'] = str(changes['titular']).lower()
+        if changes['titular'] not in titulares:
+            raise ValueError(titular_error(titulares))
+    if 'balance' in changes:
+        changes['balance'] = normalize_balance(changes['balance'])
+    return changes
@@ -1,17 +1,10 @@
 import json
-import boto3
-import os
+
+from account_store import get_account_store
 
 def handler(event, context):
-    s3 = boto3.client('s3')
-    bucket = os.environ.get('ACCOUNTS_BUCKET', 'dindin-ofx-files')
-    key = 'accounts.json'
-    
     try:
-        response = s3.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        data = json.loads(content)
-        accounts = data.get('accounts', [])
+        accounts = get_account_store().list_accounts()
         
         return {
             'statusCode': 200,
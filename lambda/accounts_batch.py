@@ -0,0 +1,84 @@
+import json
+import os
+
+from account_store import AccountConflictError, get_account_store
+from account_validation import validate_account_changes, validate_new_account
+
+MAX_BATCH_OPERATIONS = int(os.environ.get('ACCOUNTS_BATCH_MAX_OPERATIONS', '100'))
+
+OPERATIONS = ('create', 'update', 'delete')
+
+
+def validate_operation(item, titulares):
+    """
+    Converte um item do lote na operação aplicada pelo store.
+    Lança ValueError com a mensagem para o cliente se o item for inválido.
+    """
+    if not isinstance(item, dict) or item.get('op') not in OPERATIONS:
+        raise ValueError('Campo op deve ser "create", "update" ou "delete"')
+
+    kind = item['op']
+    if kind == 'create':
+        return {'op': kind, 'account': validate_new_account(item.get('account'), titulares)}
+
+    if not item.get('id'):
+        raise ValueError('ID da conta não fornecido')
+    if kind == 'update':
+        return {'op': kind, 'id': item['id'], 'changes': validate_account_changes(item.get('account'), titulares)}
+    return {'op': kind, 'id': item['id']}
+
+
+def validate_operations(items, titulares):
+    """
+    Valida o lote inteiro antes de qualquer escrita.
+    Retorna (operações, erros), com o índice do item em cada erro.
+    """
+    operations = []
+    errors = []
+    for i, item in enumerate(items):
+        try:
+            operations.append(validate_operation(item, titulares))
+        except ValueError as e:
+            errors.append({'index': i, 'error': str(e)})
+    return operations, errors
+
+
+def response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps(body)
+    }
+
+
+def handler(event, context):
+    """
+    POST /accounts/batch: cria, altera e remove contas em lote com uma única gravação.
+    Se algum item for inválido, nada é gravado (400 com os erros por item); contas não
+    encontradas em update/delete aparecem com status 404 no resultado do item.
+    """
+    try:
+        body = json.loads(event.get('body') or '{}')
+        items = body.get('operations') if isinstance(body, dict) else None
+        if not isinstance(items, list) or not items:
+            return response(400, {'error': 'Campo operations deve ser uma lista não vazia'})
+        if len(items) > MAX_BATCH_OPERATIONS:
+            return response(400, {'error': f'Máximo de {MAX_BATCH_OPERATIONS} operações por lote'})
+
+        store = get_account_store()
+        operations, errors = validate_operations(items, store.titulares())
+        if errors:
+            return response(400, {'error': 'Operações inválidas; nada foi gravado', 'errors': errors})
+
+        results = store.apply_batch(operations)
+        for i, result in enumerate(results):
+            result['index'] = i
+        return response(200, {'results': results})
+
+    except AccountConflictError as e:
+        return response(409, {'error': 'Contas alteradas por outra requisição; tente novamente', 'details': str(e)})
+    except Exception as e:
+        return response(500, {'error': 'Erro ao processar lote de contas', 'details': str(e)})
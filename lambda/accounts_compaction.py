@@ -0,0 +1,21 @@
+import json
+
+from account_store import ACCOUNTS_COMPACT_THRESHOLD, JournaledAccountStore, ShardedAccountStore, get_account_store
+
+
+def handler(event, context):
+    """
+    Compactação agendada do diário de contas: incorpora os registros pendentes ao snapshot
+    quando passam de ACCOUNTS_COMPACT_THRESHOLD (por shard, no backend sharded, que também
+    atualiza os totais do manifesto). Com {"force": true} no evento, compacta qualquer
+    registro pendente.
+    """
+    store = get_account_store()
+    if not isinstance(store, (JournaledAccountStore, ShardedAccountStore)):
+        print(f"Backend de contas sem diário ({type(store).__name__}); nada a compactar")
+        return {'compacted': False}
+
+    threshold = 1 if (event or {}).get('force') else ACCOUNTS_COMPACT_THRESHOLD
+    summary = store.compact(threshold)
+    print(f"Compactação do diário de contas: {json.dumps(summary)}")
+    return summary
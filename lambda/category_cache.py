@@ -0,0 +1,63 @@
+import os
+from collections import OrderedDict
+
+from category_rules import transaction_text
+
+CATEGORY_CACHE_SIZE = int(os.environ.get('CATEGORY_CACHE_SIZE', '4096'))
+
+
+def category_key(transaction):
+    """
+    Chave do cache: memo normalizado (ou nome), TRNTYPE e sinal do valor.
+    """
+    amount = transaction.amount_cents or 0
+    return (transaction_text(transaction), (transaction.type or '').upper(), (amount > 0) - (amount < 0))
+
+
+class CategoryCache:
+    """
+    Cache LRU limitado de categorias sugeridas, na frente do categorizador ativo.
+    As entradas valem para uma versão do categorizador; outra versão esvazia o cache.
+    """
+
+    def __init__(self, maxsize=CATEGORY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version = None
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def use_version(self, version):
+        """
+        Passa a usar a versão informada do categorizador, descartando as entradas de outra versão.
+        """
+        if version != self.version:
+            if self.entries:
+                self.stats['invalidations'] += 1
+                print(f"Cache de categorias invalidado: versão {self.version} -> {version}")
+            self.entries.clear()
+            self.version = version
+
+    def get(self, key):
+        """
+        Categoria em cache para a chave, ou None (contado como miss).
+        """
+        category = self.entries.get(key)
+        if category is None:
+            self.stats['misses'] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return category
+
+    def put(self, key, category):
+        self.entries[key] = category
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def describe(self):
+        return dict(self.stats, size=len(self.entries), maxsize=self.maxsize, version=self.version)
+
+
+# Estado do container: compartilhado entre invocações enquanto o Lambda estiver quente
+category_cache = CategoryCache()
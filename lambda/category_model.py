@@ -0,0 +1,187 @@
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional no pacote do Lambda
+    np = None
+
+# Modelo gerado por scripts/train_category_model.py e empacotado junto com o código
+MODEL_PATH = os.environ.get(
+    'CATEGORY_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_model.bin')
+)
+
+# Formato: MAGIC, tamanho do cabeçalho (uint32), cabeçalho JSON alinhado a 4 bytes e a matriz
+# float32 little-endian [bucket][classe] com log P(token | classe)
+MODEL_MAGIC = b'DNBC'
+DEFAULT_BUCKETS = 1 << 13
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# Limite do cache token -> bucket de cada modelo
+MAX_CACHED_TOKENS = 100000
+
+TOKEN_PATTERN = re.compile(r'[A-Z][A-Z0-9]+')
+
+
+def transaction_features(text, trntype, sign):
+    """
+    Tokens do memo normalizado (sem números soltos), mais o TRNTYPE e o sinal do valor.
+    """
+    return TOKEN_PATTERN.findall(text) + [f"__TYPE_{trntype}", f"__SIGN_{sign}"]
+
+
+def hash_token(token, buckets):
+    return zlib.crc32(token.encode('utf-8')) % buckets
+
+
+def feature_buckets(text, trntype, sign, buckets):
+    return [hash_token(token, buckets) for token in transaction_features(text, trntype, sign)]
+
+
+class NaiveBayesModel:
+    """
+    Naive Bayes multinomial sobre tokens com hashing (vocabulário fixo de `buckets` posições).
+    Os pesos ficam mapeados em memória a partir do arquivo, sem cópia, quando há NumPy.
+    """
+
+    def __init__(self, header, weights):
+        self.version = header['version']
+        self.classes = header['classes']
+        self.buckets = header['buckets']
+        self.priors = header['priors']
+        self.min_confidence = header.get('min_confidence', DEFAULT_MIN_CONFIDENCE)
+        self.weights = weights
+        # Tokens de memo se repetem muito: o bucket de cada um é calculado uma vez
+        self.token_buckets = {}
+
+    def feature_buckets(self, text, trntype, sign):
+        token_buckets = self.token_buckets
+        if len(token_buckets) > MAX_CACHED_TOKENS:
+            token_buckets.clear()
+        ids = []
+        for token in transaction_features(text, trntype, sign):
+            bucket = token_buckets.get(token)
+            if bucket is None:
+                bucket = token_buckets[token] = hash_token(token, self.buckets)
+            ids.append(bucket)
+        return ids
+
+    def predict_numpy(self, buckets_list):
+        """
+        Soma os pesos de todos os tokens do lote de uma vez (np.add.reduceat por transação)
+        e escolhe a classe de maior pontuação.
+        """
+        matrix = np.asarray(self.weights).reshape(self.buckets, len(self.classes))
+        ids = np.fromiter((b for ids in buckets_list for b in ids), dtype=np.int64)
+        starts = np.cumsum([0] + [len(ids) for ids in buckets_list[:-1]])
+        scores = np.add.reduceat(matrix[ids].astype(np.float64), starts, axis=0) + np.asarray(self.priors)
+
+        best = scores.argmax(axis=1)
+        confidence = 1 / np.exp(scores - scores.max(axis=1, keepdims=True)).sum(axis=1)
+        return best.tolist(), confidence.tolist()
+
+    def predict_python(self, buckets_list):
+        n_classes = len(self.classes)
+        best_classes = []
+        confidences = []
+        for ids in buckets_list:
+            scores = list(self.priors)
+            for bucket in ids:
+                offset = bucket * n_classes
+                scores = [s + w for s, w in zip(scores, self.weights[offset:offset + n_classes])]
+            best = max(range(n_classes), key=scores.__getitem__)
+            best_classes.append(best)
+            confidences.append(1 / sum(math.exp(s - scores[best]) for s in scores))
+        return best_classes, confidences
+
+    def predict_batch(self, keys):
+        """
+        Categoria prevista para cada chave (texto normalizado, TRNTYPE, sinal) do lote,
+        ou None quando a confiança fica abaixo de min_confidence.
+        """
+        if not keys:
+            return []
+        buckets_list = [self.feature_buckets(text, trntype, sign) for text, trntype, sign in keys]
+        predict = self.predict_numpy if np is not None else self.predict_python
+        best_classes, confidences = predict(buckets_list)
+        return [
+            self.classes[best] if confidence >= self.min_confidence else None
+            for best, confidence in zip(best_classes, confidences)
+        ]
+
+
+def save_model(path, header, weights):
+    """
+    Grava o modelo no formato binário lido por load_model.
+    `weights` é um iterável de floats na ordem [bucket][classe].
+    """
+    data = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data += b' ' * (-(len(MODEL_MAGIC) + 4 + len(data)) % 4)
+    packed = array('f', weights)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    with open(path, 'wb') as f:
+        f.write(MODEL_MAGIC + struct.pack('<I', len(data)) + data)
+        f.write(packed.tobytes())
+
+
+def load_model(path=MODEL_PATH):
+    """
+    Abre o modelo do disco. Com NumPy, os pesos são lidos direto do arquivo mapeado (mmap);
+    sem ele, são carregados em um array('f').
+    Lança ValueError se o arquivo não for um modelo válido.
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        if mapped[:4] != MODEL_MAGIC:
+            raise ValueError(f"Arquivo {path} não é um modelo de categorização")
+        header_size = struct.unpack('<I', mapped[4:8])[0]
+        offset = 8 + header_size
+        header = json.loads(mapped[8:offset].decode('utf-8'))
+
+        expected = header['buckets'] * len(header['classes'])
+        if len(mapped) < offset + expected * 4:
+            raise ValueError(f"Modelo {path} truncado")
+    except Exception:
+        mapped.close()
+        raise
+
+    if np is not None:
+        weights = np.frombuffer(mapped, dtype='<f4', count=expected, offset=offset)
+    else:
+        # Sem NumPy os pesos são copiados para o array e o mapeamento não é mais necessário
+        weights = array('f')
+        weights.frombytes(mapped[offset:offset + expected * 4])
+        mapped.close()
+        if sys.byteorder == 'big':
+            weights.byteswap()
+    return NaiveBayesModel(header, weights)
+
+
+# Estado do container: o modelo é aberto no primeiro uso
+_state = {'loaded': False, 'model': None}
+
+
+def get_model():
+    """
+    Retorna o modelo de categorização, carregado na primeira chamada, ou None se não houver
+    modelo treinado (as regras continuam valendo sozinhas).
+    """
+    if not _state['loaded']:
+        _state['loaded'] = True
+        if os.path.exists(MODEL_PATH):
+            try:
+                _state['model'] = load_model(MODEL_PATH)
+                print(f"Modelo de categorização {_state['model'].version} carregado de {MODEL_PATH}")
+            except Exception as e:
+                print(f"Erro ao carregar modelo de categorização de {MODEL_PATH}: {str(e)}")
+    return _state['model']
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import time
+from collections import deque
+
+from object_store import get_object_store
+
+# Tabela de regras padrão, empacotada com o código
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_rules.json')
+
+# Tabela editável no bucket; substitui a padrão sem novo deploy
+RULES_KEY = os.environ.get('CATEGORY_RULES_KEY', 'config/category_rules.json')
+RULES_FROM_BUCKET = os.environ.get('CATEGORY_RULES_FROM_BUCKET', 'true').lower() == 'true'
+RULES_REFRESH_SECONDS = int(os.environ.get('CATEGORY_RULES_REFRESH_SECONDS', '60'))
+
+# Escopo usado para os tipos de transação sem escopo próprio
+FALLBACK_SCOPE = '*'
+
+
+def normalize_text(text):
+    """
+    Texto usado na classificação: maiúsculas e espaços colapsados.
+    """
+    return ' '.join(text.upper().split())
+
+
+def transaction_text(transaction):
+    """
+    Memo normalizado da transação (vazio quando não há memo).
+    """
+    return normalize_text(transaction.memo or '')
+
+
+class KeywordMatcher:
+    """
+    Autômato de Aho-Corasick sobre as palavras-chave das regras: encontra todas as
+    ocorrências em uma única passada pelo texto, com custo independente do número de regras.
+    Cada palavra-chave carrega um valor comparável; o casamento devolve o maior valor encontrado.
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]
+
+        for keyword, value in keywords:
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                    self.goto[state][char] = next_state
+                state = next_state
+            self.best[state] = max_value(self.best[state], value)
+
+        # Links de falha em largura; cada estado herda o melhor valor do seu sufixo e as
+        # transições que faltam são completadas pelo estado de falha (autômato determinístico)
+        alphabet = {char for state_goto in self.goto for char in state_goto}
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            state_goto = self.goto[state]
+            fallback_goto = self.goto[self.fail[state]]
+            for char, next_state in state_goto.items():
+                queue.append(next_state)
+                self.fail[next_state] = fallback_goto.get(char, 0)
+                self.best[next_state] = max_value(self.best[next_state], self.best[self.fail[next_state]])
+            for char in alphabet - state_goto.keys():
+                target = fallback_goto.get(char, 0)
+                if target:
+                    state_goto[char] = target
+
+    def best_match(self, text):
+        """
+        Maior valor entre as palavras-chave contidas em `text`, ou None se nenhuma ocorrer.
+        """
+        goto, best = self.goto, self.best
+        state = 0
+        result = None
+        for char in text:
+            state = goto[state].get(char, 0)
+            value = best[state]
+            if value is not None and (result is None or value > result):
+                result = value
+        return result
+
+
+def max_value(current, value):
+    if current is None:
+        return value
+    if value is None:
+        return current
+    return max(current, value)
+
+
+class RuleSet:
+    """
+    Tabela de regras de categorização compilada.
+    Cada escopo (TRNTYPE, ou '*' para os demais) tem regras palavra-chave -> categoria e uma
+    categoria padrão. Vence a regra de maior prioridade entre as que casam; no empate, a
+    que aparece primeiro na tabela.
+    """
+
+    def __init__(self, table, version=None):
+        self.version = version or str(table.get('version'))
+        self.scopes = {}
+        for trntype, scope in table['scopes'].items():
+            keywords = []
+            for order, rule in enumerate(scope.get('rules', [])):
+                rank = (rule.get('priority', 0), -order, rule['category'])
+                keywords.extend((normalize_text(keyword), rank) for keyword in rule['keywords'] if keyword.strip())
+            self.scopes[trntype.upper()] = (KeywordMatcher(keywords), scope['default'])
+
+        if FALLBACK_SCOPE not in self.scopes:
+            raise ValueError(f"Tabela de regras sem o escopo '{FALLBACK_SCOPE}'")
+
+    def categorize(self, transaction):
+        """
+        Categoria da transação pelo memo normalizado.
+        """
+        return self.categorize_text(transaction_text(transaction), transaction.type)
+
+    def categorize_text(self, text, trntype):
+        matcher, default = self.scopes.get((trntype or '').upper(), self.scopes[FALLBACK_SCOPE])
+        match = matcher.best_match(text)
+        return match[2] if match else default
+
+
+def compile_rules(data):
+    """
+    Compila o JSON da tabela de regras (bytes ou str). A versão combina o campo 'version'
+    com o início do SHA-256 do conteúdo, e muda a cada edição mesmo que o campo não mude.
+    Lança ValueError se a tabela for inválida.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    try:
+        table = json.loads(data)
+        digest = hashlib.sha256(data).hexdigest()[:8]
+        return RuleSet(table, version=f"{table.get('version', 'rules')}-{digest}")
+    except (KeyError, TypeError, AttributeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Tabela de regras inválida: {str(e)}")
+
+
+# Estado do container: a tabela compilada é reaproveitada entre invocações
+_state = {'rule_set': None, 'digest': None, 'checked_at': None}
+
+
+def load_default_rules():
+    with open(DEFAULT_RULES_PATH, 'rb') as f:
+        return compile_rules(f.read())
+
+
+def get_rule_set(store=None):
+    """
+    Retorna a tabela de regras em uso. A tabela do bucket (RULES_KEY) é consultada no máximo a
+    cada RULES_REFRESH_SECONDS e só é recompilada quando o conteúdo muda; sem ela, ou se
+    estiver inválida, vale a tabela atual (a padrão na primeira carga).
+    """
+    if _state['rule_set'] is None:
+        _state['rule_set'] = load_default_rules()
+
+    now = time.monotonic()
+    checked_at = _state['checked_at']
+    if not RULES_FROM_BUCKET or (checked_at is not None and now - checked_at < RULES_REFRESH_SECONDS):
+        return _state['rule_set']
+    _state['checked_at'] = now
+
+    try:
+        data = (store or get_object_store()).get(RULES_KEY)
+        if data is None:
+            return _state['rule_set']
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != _state['digest']:
+            _state['rule_set'] = compile_rules(data)
+            _state['digest'] = digest
+            print(f"Regras de categorização recarregadas de {RULES_KEY}: versão {_state['rule_set'].version}")
+    except Exception as e:
+        print(f"Erro ao carregar regras de categorização de {RULES_KEY}: {str(e)}")
+
+    return _state['rule_set']
@@ -1,64 +1,27 @@
 import json
-import boto3
-import os
-import uuid
+
+from account_store import AccountConflictError, get_account_store
+from account_validation import validate_new_account
 
 def handler(event, context):
-    s3 = boto3.client('s3')
-    bucket = os.environ.get('ACCOUNTS_BUCKET', 'dindin-ofx-files')
-    key = 'accounts.json'
-    
     try:
         # Lê o corpo da requisição
         body = json.loads(event.get('body', '{}'))
         
-        # Valida os campos obrigatórios
-        required_fields = ['name', 'balance', 'category', 'type', 'icon', 'titular']
-        for field in required_fields:
-            if field not in body:
-                return {
-                    'statusCode': 400,
-                    'body': json.dumps({
-                        'error': f'Campo obrigatório ausente: {field}'
-                    })
-                }
-        
-        # Validação do campo titular
-        if body['titular'] not in ['ricardo', 'priscila']:
+        # Valida os campos obrigatórios, o titular e o saldo (em centavos exatos, sem float)
+        store = get_account_store()
+        try:
+            new_account = validate_new_account(body, store.titulares())
+        except ValueError as e:
             return {
                 'statusCode': 400,
                 'body': json.dumps({
-                    'error': 'Campo titular deve ser "ricardo" ou "priscila"'
+                    'error': str(e)
                 })
             }
         
-        # Lê o arquivo atual de contas
-        response = s3.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        data = json.loads(content)
-        accounts = data.get('accounts', [])
-        
-        # Cria a nova conta
-        new_account = {
-            'id': str(uuid.uuid4()),
-            'name': body['name'],
-            'balance': float(body['balance']),
-            'category': body['category'],
-            'type': body['type'],
-            'icon': body['icon'],
-            'titular': body['titular']
-        }
-        
-        # Adiciona a nova conta à lista
-        accounts.append(new_account)
-        
-        # Atualiza o arquivo no S3
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=json.dumps({'accounts': accounts}, indent=2),
-            ContentType='application/json'
-        )
+        # Grava a nova conta
+        store.create(new_account)
         
         return {
             'statusCode': 201,
@@ -69,6 +32,14 @@ def handler(event, context):
             'body': json.dumps(new_account)
         }
         
+    except AccountConflictError as e:
+        return {
+            'statusCode': 409,
+            'body': json.dumps({
+                'error': 'Contas alteradas por outra requisição; tente novamente',
+                'details': str(e)
+            })
+        }
     except Exception as e:
         return {
             'statusCode': 500,
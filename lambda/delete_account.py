@@ -1,12 +1,8 @@
 import json
-import boto3
-import os
+
+from account_store import AccountConflictError, get_account_store
 
 def handler(event, context):
-    s3 = boto3.client('s3')
-    bucket = os.environ.get('ACCOUNTS_BUCKET', 'dindin-ofx-files')
-    key = 'accounts.json'
-    
     try:
         # Obtém o ID da conta da URL
         account_id = event.get('pathParameters', {}).get('id')
@@ -18,15 +14,9 @@ def handler(event, context):
                 })
             }
         
-        # Lê o arquivo atual de contas
-        response = s3.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        data = json.loads(content)
-        accounts = data.get('accounts', [])
-        
-        # Procura a conta pelo ID
-        account_index = next((i for i, acc in enumerate(accounts) if acc['id'] == account_id), None)
-        if account_index is None:
+        # Remove a conta, encontrada pelo ID
+        deleted_account = get_account_store().delete(account_id)
+        if deleted_account is None:
             return {
                 'statusCode': 404,
                 'body': json.dumps({
@@ -34,17 +24,6 @@ def handler(event, context):
                 })
             }
         
-        # Remove a conta
-        deleted_account = accounts.pop(account_index)
-        
-        # Atualiza o arquivo no S3
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=json.dumps({'accounts': accounts}, indent=2),
-            ContentType='application/json'
-        )
-        
         return {
             'statusCode': 200,
             'headers': {
@@ -54,6 +33,14 @@ def handler(event, context):
             'body': json.dumps(deleted_account)
         }
         
+    except AccountConflictError as e:
+        return {
+            'statusCode': 409,
+            'body': json.dumps({
+                'error': 'Contas alteradas por outra requisição; tente novamente',
+                'details': str(e)
+            })
+        }
     except Exception as e:
         return {
             'statusCode': 500,
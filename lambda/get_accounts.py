@@ -1,27 +1,24 @@
 import json
-import boto3
+
+from account_store import get_account_store
+from account_validation import titular_error
 
 def get_accounts(event, context):
     try:
-        # Lê o arquivo de contas do S3
-        s3 = boto3.client('s3')
-        response = s3.get_object(Bucket='dindin-ofx-files', Key='accounts.json')
-        accounts_data = json.loads(response['Body'].read().decode('utf-8'))
-        
-        # Filtra por titular se especificado
-        titular = event.get('queryStringParameters', {}).get('titular')
+        # Filtra por titular se especificado: lê só o shard dele
+        store = get_account_store()
+        titular = (event.get('queryStringParameters') or {}).get('titular')
         if titular:
-            if titular not in ['ricardo', 'priscila']:
+            titulares = store.titulares()
+            if titular not in titulares:
                 return {
                     'statusCode': 400,
                     'body': json.dumps({
-                        'error': 'Campo titular deve ser "ricardo" ou "priscila"'
+                        'error': titular_error(titulares)
                     })
                 }
-            accounts_data['accounts'] = [
-                account for account in accounts_data['accounts']
-                if account.get('titular') == titular
-            ]
+
+        accounts_data = {'accounts': store.list_accounts(titular or None)}
         
         return {
             'statusCode': 200,
@@ -0,0 +1,99 @@
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Arquivos enviados pela URL assinada chegam em incoming/<job>.ofx e disparam o ofx_ingest
+INCOMING_PREFIX = 'incoming'
+JOBS_PREFIX = 'jobs'
+
+# Validade da URL de upload, em segundos
+UPLOAD_URL_EXPIRES = int(os.environ.get('OFX_UPLOAD_URL_EXPIRES', '900'))
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+INCOMING_KEY_PATTERN = re.compile(rf'^{INCOMING_PREFIX}/([0-9a-f]{{32}})\.ofx$')
+
+# Estados do job: aguardando o upload, em processamento, concluído ou com erro.
+# 'expired' não é gravado: é o job pendente cuja URL de upload já venceu.
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_EXPIRED = 'expired'
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def is_job_id(value):
+    return bool(value and JOB_ID_PATTERN.match(value))
+
+
+def job_key(job_id):
+    return f"{JOBS_PREFIX}/{job_id}.json"
+
+
+def incoming_key(job_id):
+    return f"{INCOMING_PREFIX}/{job_id}.ofx"
+
+
+def job_id_from_key(key):
+    """
+    Id do job de um arquivo em incoming/, ou None para os demais arquivos do bucket.
+    """
+    match = INCOMING_KEY_PATTERN.match(key)
+    return match.group(1) if match else None
+
+
+def save_job(store, job):
+    store.put(job_key(job['jobId']), json.dumps(job), content_type='application/json')
+
+
+def create_job(store, job_id, expires_in=UPLOAD_URL_EXPIRES):
+    """
+    Registra o job de um upload que ainda vai acontecer.
+    """
+    now = utc_now()
+    job = {
+        'jobId': job_id,
+        'status': STATUS_PENDING,
+        'key': incoming_key(job_id),
+        'createdAt': now.isoformat(),
+        'updatedAt': now.isoformat(),
+        'uploadExpiresAt': (now + timedelta(seconds=expires_in)).isoformat()
+    }
+    save_job(store, job)
+    return job
+
+
+def load_job(store, job_id):
+    """
+    Retorna o job, ou None se ele não existir. Um job pendente com a URL vencida é
+    informado como 'expired'.
+    """
+    data = store.get(job_key(job_id))
+    if data is None:
+        return None
+    job = json.loads(data)
+    expires_at = job.get('uploadExpiresAt')
+    if job['status'] == STATUS_PENDING and expires_at and datetime.fromisoformat(expires_at) < utc_now():
+        job['status'] = STATUS_EXPIRED
+    return job
+
+
+def update_job(store, job_id, status, **fields):
+    """
+    Grava o novo estado do job (e campos como 'result' ou 'error'). Um arquivo colocado em
+    incoming/ sem passar pelo POST /ofx-uploads ganha o job nesse momento.
+    """
+    data = store.get(job_key(job_id))
+    job = json.loads(data) if data else {'jobId': job_id, 'key': incoming_key(job_id), 'createdAt': utc_now().isoformat()}
+    job.update(fields, status=status, updatedAt=utc_now().isoformat())
+    save_job(store, job)
+    return job
@@ -0,0 +1,133 @@
+import json
+
+from transaction_partitions import (LATEST_POINTER_KEY, account_key, decode_partition, encode_partition,
+                                    group_by_month, load_manifest, manifest_key, partition_key)
+
+# Campos usados como chave quando o banco não informa o FITID
+FALLBACK_KEY_FIELDS = ('date_posted', 'amount', 'type', 'memo', 'name', 'check_number')
+
+
+def transaction_key(transaction):
+    """
+    Chave de deduplicação da transação: o FITID ou, na falta dele, uma chave composta.
+    """
+    if transaction.fitid:
+        return f"fitid:{transaction.fitid}"
+    return 'composite:' + '|'.join(
+        '' if value is None else str(value)
+        for value in (getattr(transaction, field) for field in FALLBACK_KEY_FIELDS)
+    )
+
+
+def merge_month(existing, incoming):
+    """
+    Mescla as transações novas no mês do razão usando um índice chave -> posição.
+    Transações já conhecidas são substituídas pela versão mais recente.
+    Retorna (transações mescladas, inseridas, atualizadas).
+    """
+    merged = list(existing)
+    index = {transaction_key(t): i for i, t in enumerate(merged)}
+    inserted = updated = 0
+
+    for transaction in incoming:
+        key = transaction_key(transaction)
+        position = index.get(key)
+        if position is None:
+            index[key] = len(merged)
+            merged.append(transaction)
+            inserted += 1
+        else:
+            merged[position] = transaction
+            updated += 1
+
+    merged.sort(key=lambda t: t.date_posted or '')
+    return merged, inserted, updated
+
+
+def merge_period(current, incoming):
+    if not current:
+        return incoming
+    starts = [d for d in (current.get('startDate'), incoming.get('startDate')) if d]
+    ends = [d for d in (current.get('endDate'), incoming.get('endDate')) if d]
+    return {
+        'startDate': min(starts) if starts else None,
+        'endDate': max(ends) if ends else None
+    }
+
+
+def merge_balance(current, incoming):
+    """
+    Mantém o saldo com a data mais recente.
+    """
+    if not current or (incoming.get('date') or '') >= (current.get('date') or ''):
+        return incoming
+    return current
+
+
+def point_latest(store, account_id, result, latest):
+    """
+    Aponta o latest.ofx para o razão da conta (usado pelo /transactions?month=), com os
+    metadados de `latest` (ETag do arquivo e versão do categorizador) e o período, o saldo e
+    o intervalo de datas das transações do próprio arquivo.
+    """
+    dates = [t.date_posted[:10] for t in result.transactions if t.date_posted]
+    pointer = dict(
+        latest,
+        account=account_id,
+        period=result.period.to_dict(),
+        balance=result.balance.to_dict(),
+        range=[min(dates), max(dates)] if dates else ['', '']
+    )
+    store.put(LATEST_POINTER_KEY, json.dumps(pointer), content_type='application/json')
+
+
+def merge_statement(store, result, source_hash=None, latest=None):
+    """
+    Incorpora o extrato (OFXParseResult) ao razão da conta, particionado por mês.
+    Só os meses presentes no extrato são lidos e regravados.
+    Um arquivo com `source_hash` já incorporado é ignorado. Com `latest` (metadados do
+    latest.ofx, ver point_latest), ele é mesclado de novo, o que regrava os meses com as
+    categorias atuais, e o ponteiro passa a apontar para a conta dele.
+    As gravações não são condicionais: quem chama garante um único merge por vez no razão
+    (o ofx_ingest roda com concorrência reservada 1).
+    """
+    account_id = account_key(result.account)
+    manifest = load_manifest(store, account_id) or {}
+    sources = manifest.get('sources', [])
+    months = manifest.get('months', {})
+
+    if source_hash and source_hash in sources and not latest:
+        print(f"Extrato {source_hash} já incorporado ao razão de {account_id}")
+        return {'account': account_id, 'inserted': 0, 'updated': 0, 'months': []}
+
+    inserted = updated = 0
+    touched = group_by_month(result.transactions)
+    for month, incoming in touched.items():
+        key = partition_key(account_id, month)
+        data = store.get(key)
+        existing = decode_partition(data) if data else []
+
+        merged, month_inserted, month_updated = merge_month(existing, incoming)
+        inserted += month_inserted
+        updated += month_updated
+
+        store.put(key, encode_partition(merged), content_type='application/gzip')
+        months[month] = len(merged)
+
+    if source_hash and source_hash not in sources:
+        sources.append(source_hash)
+
+    manifest.update({
+        'account': result.account.to_dict(),
+        'period': merge_period(manifest.get('period'), result.period.to_dict()),
+        'balance': merge_balance(manifest.get('balance'), result.balance.to_dict()),
+        'months': months,
+        'sources': sources
+    })
+    store.put(manifest_key(account_id), json.dumps(manifest), content_type='application/json')
+
+    if latest:
+        point_latest(store, account_id, result, latest)
+
+    print(f"Razão de {account_id}: {inserted} inseridas, {updated} atualizadas em {sorted(touched)}")
+    return {'account': account_id, 'inserted': inserted, 'updated': updated, 'months': sorted(touched)}
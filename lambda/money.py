@@ -0,0 +1,65 @@
+from array import array
+
+CENTS_PER_UNIT = 100
+
+
+def parse_cents(text):
+    """
+    Converte uma string decimal ('-1234.56', '+12', '0,5') em centavos inteiros sem passar
+    por float(). Aceita vírgula como separador decimal quando não há ponto (permitido pelo OFX).
+    Casas além da segunda são arredondadas (meio para cima, em valor absoluto).
+    Lança ValueError se a string não for um número decimal.
+    """
+    value = text.strip()
+    negative = value.startswith('-')
+    if value[:1] in ('-', '+'):
+        value = value[1:]
+    if '.' not in value:
+        value = value.replace(',', '.')
+
+    units, _, fraction = value.partition('.')
+    if not (units or fraction) or (units and not units.isdigit()) or (fraction and not fraction.isdigit()):
+        raise ValueError(f"Valor monetário inválido: {text!r}")
+
+    cents = int(units or 0) * CENTS_PER_UNIT + int(fraction[:2].ljust(2, '0'))
+    if len(fraction) > 2 and fraction[2] >= '5':
+        cents += 1
+    return -cents if negative else cents
+
+
+def to_cents(value):
+    """
+    Converte um valor em reais (string, int ou float vindo de JSON) em centavos inteiros.
+    Floats são convertidos pela representação decimal, não multiplicados por 100.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Valor monetário inválido: {value!r}")
+    if isinstance(value, int):
+        return value * CENTS_PER_UNIT
+    if isinstance(value, float):
+        return parse_cents(format(value, 'f'))
+    if isinstance(value, str):
+        return parse_cents(value)
+    raise ValueError(f"Valor monetário inválido: {value!r}")
+
+
+def to_reais(cents):
+    """
+    Converte centavos em reais para as respostas JSON.
+    A divisão inteira por 100 devolve o float mais próximo do decimal exato (1206 -> 12.06).
+    """
+    return cents / CENTS_PER_UNIT
+
+
+def cents_array(values=()):
+    """
+    Array compacto de centavos (inteiros de 64 bits), para somas em lote.
+    """
+    return array('q', values)
+
+
+def sum_reais(values):
+    """
+    Soma valores em reais de forma exata, acumulando em centavos.
+    """
+    return to_reais(sum(to_cents(value) for value in values))
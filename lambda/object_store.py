@@ -0,0 +1,223 @@
+import fcntl
+import hashlib
+import io
+import os
+
+import boto3
+from botocore.exceptions import ClientError
+
+DEFAULT_BUCKET = os.environ.get('OFX_BUCKET', 'dindin-ofx-files')
+
+
+class PreconditionFailed(Exception):
+    """
+    A escrita condicional não aconteceu: o objeto mudou (If-Match) ou já existe (If-None-Match).
+    """
+
+
+class S3ObjectStore:
+    """
+    Objetos guardados em um bucket S3.
+    """
+
+    def __init__(self, bucket=DEFAULT_BUCKET, client=None):
+        self.bucket = bucket
+        self.client = client or boto3.client('s3')
+
+    def get(self, key):
+        """
+        Retorna o conteúdo do objeto em bytes, ou None se ele não existir.
+        """
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return response['Body'].read()
+
+    def etag(self, key):
+        """
+        ETag atual do objeto (HEAD, sem baixar o conteúdo), ou None se ele não existir.
+        """
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)['ETag']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', 'NotFound', '404'):
+                return None
+            raise
+
+    def get_if_changed(self, key, etag=None):
+        """
+        GET condicional (If-None-Match). Retorna (conteúdo, ETag); se o objeto não mudou desde
+        `etag`, o conteúdo vem None com o mesmo ETag, e se não existe, (None, None).
+        """
+        body, etag = self.open_if_changed(key, etag)
+        return (body.read() if body is not None else None), etag
+
+    def open_if_changed(self, key, etag=None):
+        """
+        Como get_if_changed, mas o conteúdo vem como stream, para ser lido aos pedaços.
+        """
+        params = {'Bucket': self.bucket, 'Key': key}
+        if etag:
+            params['IfNoneMatch'] = etag
+        try:
+            response = self.client.get_object(**params)
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code in ('304', 'NotModified'):
+                return None, etag
+            if code in ('NoSuchKey', '404'):
+                return None, None
+            raise
+        return response['Body'], response['ETag']
+
+    def put(self, key, data, content_type='application/octet-stream', if_match=None, if_none_match=None):
+        """
+        Grava o objeto e retorna o ETag da nova versão. Com `if_match` (ETag lido) ou
+        `if_none_match='*'` (só se ainda não existir), a escrita é condicional e lança
+        PreconditionFailed se a condição não valer.
+        """
+        params = {'Bucket': self.bucket, 'Key': key, 'Body': data, 'ContentType': content_type}
+        if if_match:
+            params['IfMatch'] = if_match
+        if if_none_match:
+            params['IfNoneMatch'] = if_none_match
+        try:
+            response = self.client.put_object(**params)
+        except ClientError as e:
+            # 412 quando a condição falha; 409 quando outra escrita condicional está em andamento
+            if e.response.get('Error', {}).get('Code') in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                raise PreconditionFailed(key) from e
+            raise
+        return response['ETag']
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presigned_put_url(self, key, expires_in):
+        """
+        URL assinada para o cliente enviar o objeto direto ao bucket com um PUT.
+        """
+        return self.client.generate_presigned_url(
+            'put_object', Params={'Bucket': self.bucket, 'Key': key}, ExpiresIn=expires_in
+        )
+
+    def list_keys(self, prefix='', start_after=''):
+        """
+        Gera as chaves com o prefixo informado, em ordem lexicográfica, a partir da
+        primeira depois de `start_after`.
+        """
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, StartAfter=start_after):
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+
+def content_etag(data):
+    """
+    ETag de um objeto gravado com um único PUT no S3: o MD5 do conteúdo, entre aspas.
+    """
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+class LocalObjectStore:
+    """
+    Substituto do S3 em disco para desenvolvimento e testes: cada chave é um arquivo sob `root`.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        # O último diretório é o do bucket (LOCAL_OBJECT_STORE/<bucket>)
+        self.bucket = os.path.basename(os.path.normpath(root))
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def etag(self, key):
+        data = self.get(key)
+        return content_etag(data) if data is not None else None
+
+    def get_if_changed(self, key, etag=None):
+        data = self.get(key)
+        if data is None:
+            return None, None
+        current = content_etag(data)
+        return (None, current) if current == etag else (data, current)
+
+    def open_if_changed(self, key, etag=None):
+        data, etag = self.get_if_changed(key, etag)
+        return (io.BytesIO(data) if data is not None else None), etag
+
+    def put(self, key, data, content_type='application/octet-stream', if_match=None, if_none_match=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not (if_match or if_none_match):
+            return self._replace(path, data)
+
+        # Escrita condicional: verificação e troca sob um lock exclusivo do arquivo, o que
+        # reproduz a atomicidade do If-Match/If-None-Match do S3 entre processos
+        with open(f"{path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self.get(key)
+            current_etag = content_etag(current) if current is not None else None
+            if if_none_match == '*' and current is not None:
+                raise PreconditionFailed(key)
+            if if_match and if_match != current_etag:
+                raise PreconditionFailed(key)
+            return self._replace(path, data)
+
+    def _replace(self, path, data):
+        # Grava em arquivo temporário e renomeia, como o PUT atômico do S3
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return content_etag(data)
+
+    def delete(self, key):
+        # Remove também o lock das escritas condicionais, criado ao lado do objeto
+        path = self._path(key)
+        for target in (path, f"{path}.lock"):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+
+    def presigned_put_url(self, key, expires_in):
+        """
+        Sem assinatura em disco: o "upload" é gravar o arquivo no caminho da URL file://.
+        """
+        return 'file://' + os.path.abspath(self._path(key))
+
+    def list_keys(self, prefix='', start_after=''):
+        keys = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.tmp', '.lock')):
+                    continue
+                key = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+                if key.startswith(prefix) and key > start_after:
+                    keys.append(key)
+        yield from sorted(keys)
+
+
+def get_object_store(bucket=DEFAULT_BUCKET):
+    """
+    Retorna o armazenamento do bucket: em disco se LOCAL_OBJECT_STORE apontar para um
+    diretório (um subdiretório por bucket), senão o S3.
+    """
+    local_root = os.environ.get('LOCAL_OBJECT_STORE')
+    if local_root:
+        return LocalObjectStore(os.path.join(local_root, bucket))
+    return S3ObjectStore(bucket)
@@ -0,0 +1,78 @@
+import os
+import pickle
+
+# Cópia opcional do resultado em /tmp, reaproveitada se o cache em memória estiver vazio
+SPILL_ENABLED = os.environ.get('OFX_CACHE_SPILL', 'false').lower() == 'true'
+SPILL_DIR = os.environ.get('OFX_CACHE_DIR', '/tmp')
+
+# Estado do container: persiste entre invocações enquanto o Lambda estiver quente
+_entries = {}
+cache_stats = {'hits': 0, 'misses': 0}
+
+
+def _spill_path(bucket, key, variant=None):
+    suffix = f"_{variant}" if variant else ''
+    return os.path.join(SPILL_DIR, f"ofx_cache_{bucket}_{key.replace('/', '_')}{suffix}.pickle")
+
+
+def _load_spill(bucket, key, variant=None):
+    """
+    Carrega a entrada (etag, resultado) gravada em /tmp, se existir.
+    """
+    try:
+        with open(_spill_path(bucket, key, variant), 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _save_spill(bucket, key, entry, variant=None):
+    try:
+        with open(_spill_path(bucket, key, variant), 'wb') as f:
+            pickle.dump(entry, f)
+    except Exception as e:
+        print(f"Erro ao gravar cache OFX em {SPILL_DIR}: {str(e)}")
+
+
+def get_parsed_object(store, key, parse, variant=None):
+    """
+    Retorna o resultado de parse(body) para o objeto do store, reaproveitando o parsing
+    anterior enquanto o ETag não mudar, ou None se o objeto não existir.
+    A revalidação é um GET condicional (If-None-Match): sem alteração, o S3 responde 304
+    e nem o download nem o parsing são refeitos.
+    `variant` separa resultados que dependem de algo além do objeto (por exemplo, a versão
+    das regras de categorização): com outra variante, o objeto é processado de novo.
+    """
+    bucket = store.bucket
+    cache_key = (bucket, key, variant)
+    entry = _entries.get(cache_key)
+    if entry is None and SPILL_ENABLED:
+        entry = _load_spill(bucket, key, variant)
+
+    body, etag = store.open_if_changed(key, entry[0] if entry is not None else None)
+    if body is None and etag is None:
+        _entries.pop(cache_key, None)
+        return None
+    if body is None:
+        _entries[cache_key] = entry
+        cache_stats['hits'] += 1
+        print(f"Cache OFX hit para {key} (ETag {entry[0]}): hits={cache_stats['hits']}, misses={cache_stats['misses']}")
+        return entry[1]
+
+    cache_stats['misses'] += 1
+    print(f"Cache OFX miss para {key} (ETag {etag}): hits={cache_stats['hits']}, misses={cache_stats['misses']}")
+
+    try:
+        result = parse(body)
+    finally:
+        body.close()
+    entry = (etag, result)
+    if entry[0]:
+        # Só a variante atual fica em memória: as demais não voltarão a ser pedidas
+        for stale in [k for k in _entries if k[:2] == (bucket, key)]:
+            del _entries[stale]
+        _entries[cache_key] = entry
+        if SPILL_ENABLED:
+            _save_spill(bucket, key, entry, variant)
+    return result
+
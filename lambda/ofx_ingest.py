@@ -0,0 +1,70 @@
+import json
+import urllib.parse
+
+from category_model import get_model
+from category_rules import get_rule_set
+from ingest_jobs import STATUS_DONE, STATUS_FAILED, STATUS_PROCESSING, job_id_from_key, update_job
+from ledger import merge_statement
+from object_store import get_object_store
+from ofx_parser import categorizer_version, parse_ofx_statements
+from parse_store import content_hash
+from transaction_partitions import LATEST_OFX_KEY
+
+
+def ingest_object(store, key):
+    """
+    Processa um arquivo OFX do bucket e incorpora as transações de cada extrato ao razão
+    mensal da sua conta. Em um arquivo consolidado, o latest.ofx aponta para a primeira conta.
+    """
+    raw, etag = store.get_if_changed(key)
+    if raw is None:
+        raise ValueError(f"Arquivo {key} não encontrado")
+
+    source_hash = content_hash(raw)
+    results = parse_ofx_statements(raw, store=store, statistics=False)
+
+    # O /transactions?month= só usa as partições enquanto o latest.ofx e o categorizador
+    # forem os desta ingestão
+    latest = None
+    if key == LATEST_OFX_KEY:
+        latest = {'etag': etag, 'categorizer': categorizer_version(get_rule_set(), get_model())}
+    merged = [
+        merge_statement(store, result, source_hash=source_hash, latest=latest if i == 0 else None)
+        for i, result in enumerate(results)
+    ]
+    transaction_count = sum(result.transaction_count for result in results)
+    if len(merged) == 1:
+        return dict(merged[0], key=key, transaction_count=transaction_count)
+    return {'key': key, 'transaction_count': transaction_count, 'statements': merged}
+
+
+def handler(event, context):
+    """
+    Lambda acionado pelo evento ObjectCreated do S3 quando um arquivo .ofx chega ao bucket.
+    Arquivos enviados por POST /ofx-uploads (incoming/<job>.ofx) têm o estado do job atualizado.
+    """
+    results = []
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        key = urllib.parse.unquote_plus(record['s3']['object']['key'])
+        print(f"Ingerindo s3://{bucket}/{key}")
+
+        store = get_object_store(bucket)
+        job_id = job_id_from_key(key)
+        try:
+            if job_id:
+                update_job(store, job_id, STATUS_PROCESSING)
+            result = ingest_object(store, key)
+            if job_id:
+                update_job(store, job_id, STATUS_DONE, result=result)
+            results.append(result)
+        except Exception as e:
+            print(f"Erro ao ingerir {key}: {str(e)}")
+            if job_id:
+                update_job(store, job_id, STATUS_FAILED, error=str(e))
+            results.append({'key': key, 'error': str(e)})
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(results)
+    }
@@ -0,0 +1,133 @@
+import sys
+from dataclasses import dataclass, field
+
+from money import to_cents, to_reais
+
+# Campos da transação, na ordem em que aparecem nas respostas e nas partições
+TRANSACTION_FIELDS = ('type', 'date_posted', 'amount', 'fitid', 'name', 'memo', 'check_number',
+                      'suggested_category')
+
+
+def intern_value(value):
+    return sys.intern(value) if value else value
+
+
+@dataclass(slots=True)
+class Transaction:
+    """
+    Transação do extrato (STMTTRN) em representação compacta, sem dicionário por instância.
+    Tipo e categoria se repetem em todas as transações e são strings internadas.
+    O valor fica em centavos inteiros (amount_cents); `amount` é o valor em reais.
+    Só vira dicionário na fronteira da resposta JSON e do armazenamento (to_dict).
+    """
+    type: str = None
+    date_posted: str = None
+    amount_cents: int = None
+    fitid: str = None
+    name: str = None
+    memo: str = None
+    check_number: str = None
+    suggested_category: str = None
+
+    def __post_init__(self):
+        self.type = intern_value(self.type)
+        self.suggested_category = intern_value(self.suggested_category)
+
+    @property
+    def amount(self):
+        return to_reais(self.amount_cents) if self.amount_cents is not None else None
+
+    def to_dict(self):
+        """
+        Converte para o formato de resposta, omitindo os campos ausentes.
+        """
+        response = {}
+        for name in TRANSACTION_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                response[name] = value
+        return response
+
+    @classmethod
+    def from_dict(cls, data):
+        fields = {name: data.get(name) for name in TRANSACTION_FIELDS if name != 'amount'}
+        amount = data.get('amount')
+        return cls(amount_cents=to_cents(amount) if amount is not None else None, **fields)
+
+
+
+@dataclass
+class OFXAccount:
+    """
+    Conta bancária do extrato (seção BANKACCTFROM).
+    """
+    bank: str
+    account_number: str
+    type: str
+
+    def to_dict(self):
+        return {
+            'bank': self.bank,
+            'accountNumber': self.account_number,
+            'type': self.type
+        }
+
+
+@dataclass
+class OFXPeriod:
+    """
+    Período coberto pelo extrato, com datas YYYY-MM-DD.
+    """
+    start_date: str = None
+    end_date: str = None
+
+    def to_dict(self):
+        return {
+            'startDate': self.start_date,
+            'endDate': self.end_date
+        }
+
+
+@dataclass
+class OFXBalance:
+    """
+    Saldo do extrato (seção LEDGERBAL).
+    """
+    amount: float = None
+    date: str = None
+
+    def to_dict(self):
+        return {
+            'amount': self.amount,
+            'date': self.date
+        }
+
+
+@dataclass
+class OFXParseResult:
+    """
+    Resultado do parsing de um extrato OFX.
+    `transactions` pode conter apenas um subconjunto filtrado; `transaction_count`
+    e `statistics` sempre cobrem todas as transações do arquivo.
+    `statistics` é None quando não foram pedidas.
+    """
+    account: OFXAccount
+    period: OFXPeriod
+    balance: OFXBalance
+    transactions: list = field(default_factory=list)
+    statistics: dict = None
+    transaction_count: int = 0
+
+    def to_dict(self):
+        """
+        Converte para o formato de resposta do /ofx-parser (sem 'statistics' se não calculadas).
+        """
+        response = {
+            'account': self.account.to_dict(),
+            'period': self.period.to_dict(),
+            'transactions': [transaction.to_dict() for transaction in self.transactions],
+            'balance': self.balance.to_dict()
+        }
+        if self.statistics is not None:
+            response['statistics'] = self.statistics
+        return response
@@ -1,7 +1,51 @@
+import base64
 import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
+from category_cache import category_cache, category_key
+from category_model import get_model
+from category_rules import get_rule_set
+from money import parse_cents, to_reais
+from object_store import get_object_store
+from ofx_models import OFXAccount, OFXBalance, OFXParseResult, OFXPeriod, Transaction
+from ofx_tokenizer import (DEFAULT_CHUNK_SIZE, ESCAPED_NEWLINE, build_statement, decode_value, detect_encoding,
+                           iter_chunks, iter_ofx_events, iter_statement_transactions, iter_stream_events,
+                           split_statements)
+from parse_store import content_hash, load_statements, save_statements
+from stats_engine import analyze
+
+# Tags de cada STMTTRN e o nome do campo correspondente na transação
+TRANSACTION_TAGS = {
+    'TRNTYPE': 'type',
+    'DTPOSTED': 'date_posted',
+    'TRNAMT': 'amount',
+    'FITID': 'fitid',
+    'NAME': 'name',
+    'MEMO': 'memo',
+    'CHECKNUM': 'check_number'
+}
+
+DEFAULT_PARSER_ENGINE = os.environ.get('OFX_PARSER_ENGINE', 'tokens')
+
+# Store de extratos processados (parsed/v<schema>/<sha256>.json.gz no bucket). O SHA-256 é
+# calculado antes do parsing, então com o store o arquivo é lido por inteiro, sem streaming
+PARSE_STORE_ENABLED = os.environ.get('PARSE_STORE_ENABLED', 'true').lower() == 'true'
+
+# Transações categorizadas por lote (inferência do modelo em lote)
+CATEGORY_BATCH_SIZE = int(os.environ.get('CATEGORY_BATCH_SIZE', '512'))
+
+# Arquivos com vários extratos a partir deste tamanho têm os extratos processados em paralelo,
+# um por processo; abaixo dele o custo de iniciar o pool não compensa
+PARALLEL_MIN_BYTES = int(os.environ.get('OFX_PARALLEL_MIN_BYTES', str(1024 * 1024)))
+PARALLEL_WORKERS = int(os.environ.get('OFX_PARALLEL_WORKERS', str(os.cpu_count() or 1)))
+
+# Tipo de conta dos extratos de cartão de crédito (CCSTMTRS não tem ACCTTYPE nem BANKID)
+CREDIT_CARD_ACCOUNT_TYPE = 'CREDITCARD'
+
 def parse_amount(amount_str):
     """
     Converte string de valor OFX para float.
@@ -43,9 +87,9 @@ def parse_ofx_date(date_str):
 
 def parse_ofx_amount(amount_str):
     """
-    Converte string de valor para float
+    Converte string de valor para reais (float), passando por centavos exatos
     """
-    return float(amount_str)
+    return to_reais(parse_cents(amount_str))
 
 def extract_parent_tag_content(content, tag_name):
     """
@@ -109,6 +153,23 @@ def extract_tag_content(content, tag_name):
         print(f"Erro ao extrair tag {tag_name}: {str(e)}")
         return None
 
+def build_transaction(fields):
+    """
+    Monta a transação a partir dos valores brutos das tags do STMTTRN.
+    """
+    amount = fields.get('TRNAMT')
+    date_posted = fields.get('DTPOSTED')
+    return Transaction(
+        type=fields.get('TRNTYPE'),
+        # Converte o valor para float e a data para ISO apenas se existirem
+        date_posted=parse_date(date_posted) if date_posted is not None else None,
+        amount_cents=parse_cents(amount) if amount else None,
+        fitid=fields.get('FITID'),
+        name=fields.get('NAME'),
+        memo=fields.get('MEMO'),
+        check_number=fields.get('CHECKNUM')
+    )
+
 def extract_transactions(content):
     """
     Extrai transações da seção BANKTRANLIST.
@@ -135,28 +196,9 @@ def extract_transactions(content):
                 trn_content = match.group(1)
                 
                 # Extrai detalhes da transação
-                transaction = {
-                    'type': extract_tag_content(trn_content, 'TRNTYPE'),
-                    'date_posted': extract_tag_content(trn_content, 'DTPOSTED'),
-                    'amount': extract_tag_content(trn_content, 'TRNAMT'),
-                    'fitid': extract_tag_content(trn_content, 'FITID'),
-                    'name': extract_tag_content(trn_content, 'NAME'),
-                    'memo': extract_tag_content(trn_content, 'MEMO'),
-                    'check_number': extract_tag_content(trn_content, 'CHECKNUM')
-                }
-                
-                # Converte o valor para float apenas se existir
-                if transaction['amount']:
-                    transaction['amount'] = parse_ofx_amount(transaction['amount'])
-                
-                # Remove valores None
-                transaction = {k: v for k, v in transaction.items() if v is not None}
-                
-                # Formata a data para ISO
-                if 'date_posted' in transaction:
-                    transaction['date_posted'] = parse_date(transaction['date_posted'])
-                
-                transactions.append(transaction)
+                transactions.append(build_transaction({
+                    tag: extract_tag_content(trn_content, tag) for tag in TRANSACTION_TAGS
+                }))
             except Exception as e:
                 print(f"Erro ao processar transação individual: {str(e)}")
                 continue
@@ -166,118 +208,419 @@ def extract_transactions(content):
         print(f"Erro ao extrair transações: {str(e)}")
         return []
 
-def suggest_category(transaction):
-    """
-    Sugere uma categoria com base no memo e tipo da transação.
-    """
-    memo = transaction.get('memo', '').upper()
-    trntype = transaction.get('type', '').upper()
-    amount = transaction.get('amount', 0)
-
-    # Categorias de receita
-    if trntype == 'CREDIT':
-        if 'FOLHA PAGAMENTO' in memo:
-            return 'Salário'
-        elif 'FERIAS' in memo:
-            return 'Férias'
-        elif 'PARTICIPACAO' in memo:
-            return 'Participação nos Lucros'
-        elif 'JUROS POUPANCA' in memo or 'REMUNER BAS POUP' in memo:
-            return 'Rendimentos'
-        elif 'PIX' in memo or 'TED' in memo or 'DOC' in memo:
-            return 'Transferência Recebida'
-        else:
-            return 'Outras Receitas'
-    
-    # Categorias de despesa
+def decode_document(content, encoding=None):
+    """
+    Decodifica o documento inteiro com o charset do cabeçalho, ou `encoding` (só o motor 'regex' precisa).
+    """
+    if isinstance(content, str):
+        return content
+    return decode_value(bytes(content), encoding or detect_encoding(content))
+
+def extract_statement_regex(ofx_content, encoding=None):
+    """
+    Extrai o extrato buscando cada tag com uma expressão regular sobre o documento.
+    As expressões trabalham sobre texto: o documento é decodificado e as quebras de linha
+    escapadas são substituídas antes da busca.
+    """
+    ofx_content = decode_document(ofx_content, encoding).replace(ESCAPED_NEWLINE, '\n')
+    credit_card = extract_parent_tag_content(ofx_content, 'CCACCTFROM') is not None
+    statement = {
+        'bank_id': extract_tag_content(ofx_content, 'BANKID'),
+        'account_id': extract_tag_content(ofx_content, 'ACCTID'),
+        'account_type': CREDIT_CARD_ACCOUNT_TYPE if credit_card else extract_tag_content(ofx_content, 'ACCTTYPE'),
+        'period': None,
+        'balance': None,
+        'transactions': []
+    }
+
+    banktranlist = extract_parent_tag_content(ofx_content, 'BANKTRANLIST')
+    if banktranlist:
+        statement['period'] = {
+            'start_date': extract_tag_content(banktranlist, 'DTSTART'),
+            'end_date': extract_tag_content(banktranlist, 'DTEND')
+        }
+
+    ledgerbal = extract_parent_tag_content(ofx_content, 'LEDGERBAL')
+    if ledgerbal:
+        statement['balance'] = {
+            'amount': extract_tag_content(ledgerbal, 'BALAMT'),
+            'date': extract_tag_content(ledgerbal, 'DTASOF')
+        }
+
+    statement['transactions'] = extract_transactions(ofx_content)
+    return statement
+
+def statement_from_sections(sections):
+    """
+    Converte as seções brutas do tokenizador em conta, período e saldo do extrato.
+    """
+    if 'BANKACCTFROM' not in sections and 'CCACCTFROM' in sections:
+        account = sections['CCACCTFROM']
+        account_type = CREDIT_CARD_ACCOUNT_TYPE
     else:
-        if 'CARTAO' in memo:
-            return 'Cartão de Crédito'
-        elif 'TELEFONICA' in memo or 'VIVO' in memo:
-            return 'Telefonia'
-        elif 'DDA' in memo or 'TITULO' in memo or 'BOLETO' in memo:
-            return 'Contas e Boletos'
-        elif 'PIX' in memo or 'TED' in memo or 'DOC' in memo:
-            return 'Transferência Enviada'
-        elif 'COMPRA' in memo:
-            return 'Compras'
-        else:
-            return 'Outras Despesas'
+        account = sections.get('BANKACCTFROM', {})
+        account_type = account.get('ACCTTYPE')
+
+    statement = {
+        'bank_id': account.get('BANKID'),
+        'account_id': account.get('ACCTID'),
+        'account_type': account_type,
+        'period': None,
+        'balance': None,
+        'transactions': []
+    }
+
+    if 'BANKTRANLIST' in sections:
+        statement['period'] = {
+            'start_date': sections['BANKTRANLIST'].get('DTSTART'),
+            'end_date': sections['BANKTRANLIST'].get('DTEND')
+        }
+
+    if 'LEDGERBAL' in sections:
+        statement['balance'] = {
+            'amount': sections['LEDGERBAL'].get('BALAMT'),
+            'date': sections['LEDGERBAL'].get('DTASOF')
+        }
+
+    return statement
+
+def iter_built_transactions(raw_transactions):
+    """
+    Converte cada STMTTRN bruto em transação, ignorando as que falharem.
+    """
+    for fields in raw_transactions:
+        try:
+            yield build_transaction(fields)
+        except Exception as e:
+            print(f"Erro ao processar transação individual: {str(e)}")
+            continue
+
+def extract_statement_tokens(ofx_content, encoding=None):
+    """
+    Extrai o extrato tokenizando o documento (texto ou bytes) uma única vez.
+    """
+    tree = build_statement(iter_ofx_events(ofx_content, encoding))
+    statement = statement_from_sections(tree['sections'])
+    statement['transactions'] = list(iter_built_transactions(tree['transactions']))
+    return statement
+
+def stream_transactions(source, statement=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Lê o OFX em blocos de um arquivo ou StreamingBody e gera as transações uma a uma,
+    sem carregar nem decodificar o documento inteiro em memória.
+    Se `statement` for informado, é preenchido com conta, período e saldo ao final da leitura.
+    Só o primeiro extrato do arquivo é lido (ver parse_ofx_statements para os demais).
+    """
+    sections = {}
+    events = iter_stream_events(iter_chunks(source, chunk_size))
+    yield from iter_built_transactions(iter_statement_transactions(events, sections))
+
+    if statement is not None:
+        statement.update(statement_from_sections(sections))
+        del statement['transactions']
+
+PARSER_ENGINES = {
+    'regex': extract_statement_regex,
+    'tokens': extract_statement_tokens
+}
+
+def resolve_engine(engine):
+    engine = engine or DEFAULT_PARSER_ENGINE
+    if engine not in PARSER_ENGINES:
+        raise ValueError(f"Motor de parsing desconhecido: {engine}")
+    return engine
+
+def parse_statement_block(task):
+    """
+    Extrai um extrato (bloco de split_statements) com o motor informado.
+    `task` é (bloco, charset, motor); função de módulo para poder rodar no pool de processos.
+    """
+    block, encoding, engine = task
+    return PARSER_ENGINES[engine](block, encoding)
+
+def parse_statement_blocks(blocks, encoding, engine):
+    """
+    Extrai os extratos de um arquivo. Arquivos grandes com vários extratos são processados
+    em paralelo, um extrato por processo; onde não há pool de processos (o Lambda não tem
+    /dev/shm para os semáforos do multiprocessing), os extratos são processados em série.
+    """
+    size = sum(len(block) for block in blocks)
+    if len(blocks) > 1 and PARALLEL_WORKERS > 1 and size >= PARALLEL_MIN_BYTES:
+        # Fatias de memoryview não são serializáveis: cada processo recebe a cópia do seu bloco
+        tasks = [(block if isinstance(block, str) else bytes(block), encoding, engine) for block in blocks]
+        try:
+            with ProcessPoolExecutor(max_workers=min(PARALLEL_WORKERS, len(blocks))) as pool:
+                return list(pool.map(parse_statement_block, tasks))
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            print(f"Pool de processos indisponível ({str(e)}); processando {len(blocks)} extratos em série")
+
+    return [parse_statement_block((block, encoding, engine)) for block in blocks]
+
+def parse_ofx_content(ofx_content, engine=None):
+    """
+    Extrai conta, período, saldo e transações de cada extrato (STMTRS ou CCSTMTRS) do
+    conteúdo OFX usando o motor escolhido ('regex' ou 'tokens'; padrão definido por
+    OFX_PARSER_ENGINE). Retorna a lista de extratos, na ordem do arquivo.
+    Lança ValueError se alguma seção obrigatória estiver ausente.
+    """
+    engine = resolve_engine(engine)
+
+    # O cabeçalho (e o charset) fica fora dos blocos: é lido uma vez para o arquivo todo
+    encoding = None if isinstance(ofx_content, str) else detect_encoding(ofx_content)
+    statements = parse_statement_blocks(split_statements(ofx_content), encoding, engine)
+    validate_statements(statements, [len(statement['transactions']) for statement in statements])
+    return statements
+
+def validate_statements(statements, transaction_counts):
+    """
+    Valida os extratos de um arquivo. Em um arquivo consolidado, uma conta pode não ter
+    movimento no período; basta que o arquivo tenha alguma transação.
+    """
+    for statement, transaction_count in zip(statements, transaction_counts):
+        validate_statement(statement, transaction_count, require_transactions=len(statements) == 1)
+    if not sum(transaction_counts):
+        raise ValueError("Nenhuma transação encontrada no arquivo OFX")
+
+def validate_statement(statement, transaction_count, require_transactions=True):
+    """
+    Lança ValueError se alguma seção obrigatória do extrato estiver ausente.
+    Extratos de cartão de crédito não têm BANKID.
+    """
+    bank_id = statement['bank_id']
+    account_id = statement['account_id']
+    account_type = statement['account_type']
+    if not account_id or not account_type or not (bank_id or account_type == CREDIT_CARD_ACCOUNT_TYPE):
+        print(f"Informações da conta incompletas: bank_id={bank_id}, account_id={account_id}, account_type={account_type}")
+        raise ValueError("Informações da conta não encontradas no arquivo OFX")
+
+    if statement['period'] is None:
+        raise ValueError("Seção BANKTRANLIST não encontrada no arquivo OFX")
+
+    if statement['balance'] is None:
+        raise ValueError("Seção LEDGERBAL não encontrada no arquivo OFX")
+
+    if require_transactions and not transaction_count:
+        raise ValueError("Nenhuma transação encontrada no arquivo OFX")
+
+def suggest_category(transaction, rule_set=None):
+    """
+    Sugere uma categoria com base no memo e tipo da transação, pela tabela de regras
+    compilada (ver category_rules; a tabela em uso é recarregada do bucket quando muda).
+    """
+    return (rule_set or get_rule_set()).categorize(transaction)
+
+def build_period(period):
+    """
+    Converte o período bruto do extrato em OFXPeriod com datas YYYY-MM-DD.
+    """
+    return OFXPeriod(
+        start_date=parse_ofx_date(period['start_date']) if period['start_date'] else None,
+        end_date=parse_ofx_date(period['end_date']) if period['end_date'] else None
+    )
+
+def build_balance(balance):
+    """
+    Converte o saldo bruto do extrato em OFXBalance (valor em float e data YYYY-MM-DD).
+    """
+    return OFXBalance(
+        amount=parse_ofx_amount(balance['amount']) if balance['amount'] else None,
+        date=parse_ofx_date(balance['date']) if balance['date'] else None
+    )
+
+def categorizer_version(rule_set, model):
+    """
+    Versão do categorizador ativo: regras e, se houver, o modelo treinado.
+    """
+    return rule_set.version if model is None else f"{rule_set.version}+{model.version}"
+
+def categorize_batch(batch, rule_set, model):
+    """
+    Categoriza um lote de transações: as chaves fora do cache são previstas de uma vez
+    pelo modelo, e as que ficam sem previsão confiável caem nas regras.
+    """
+    keys = [category_key(transaction) for transaction in batch]
+    categories = [category_cache.get(key) for key in keys]
+
+    missing = list(dict.fromkeys(key for key, category in zip(keys, categories) if category is None))
+    predictions = model.predict_batch(missing) if model is not None else [None] * len(missing)
+    resolved = {}
+    for key, predicted in zip(missing, predictions):
+        resolved[key] = predicted or rule_set.categorize_text(key[0], key[1])
+        category_cache.put(key, resolved[key])
+
+    for transaction, key, category in zip(batch, keys, categories):
+        transaction.suggested_category = category or resolved[key]
+
+def categorize_transactions(transactions, batch_size=CATEGORY_BATCH_SIZE):
+    """
+    Adiciona a categoria sugerida às transações de um iterável, em lotes de `batch_size`.
+    O mesmo categorizador vale para o extrato inteiro: o modelo treinado (ver category_model),
+    quando existe, e a tabela de regras como fallback. Memos repetidos são resolvidos pelo
+    cache de categorias do container (ver category_cache).
+    """
+    rule_set = get_rule_set()
+    model = get_model()
+    category_cache.use_version(categorizer_version(rule_set, model))
+
+    batch = []
+    for transaction in transactions:
+        batch.append(transaction)
+        if len(batch) >= batch_size:
+            categorize_batch(batch, rule_set, model)
+            yield from batch
+            batch = []
+    if batch:
+        categorize_batch(batch, rule_set, model)
+        yield from batch
+    print(f"Cache de categorias: {json.dumps(category_cache.describe())}")
 
 def analyze_transactions(transactions):
     """
     Realiza análise estatística das transações.
+    Aceita qualquer iterável, inclusive o gerador de stream_transactions.
+    A agregação é colunar e vetorizada com NumPy quando disponível (ver stats_engine).
     """
-    # Inicializa contadores
-    stats = {
-        'total_creditos': 0,
-        'total_debitos': 0,
-        'count_creditos': 0,
-        'count_debitos': 0,
-        'maior_credito': 0,
-        'maior_debito': 0,
-        'por_categoria': {},
-        'por_mes': {}
-    }
-    
-    for transaction in transactions:
-        amount = transaction.get('amount', 0)
-        category = transaction.get('suggested_category', 'Não Categorizado')
-        date = transaction.get('date_posted', '')[:7]  # Pega só ano e mês
-        
-        # Atualiza totais por categoria
-        if category not in stats['por_categoria']:
-            stats['por_categoria'][category] = {
-                'total': 0,
-                'count': 0,
-                'media': 0,
-                'maior': 0,
-                'menor': float('inf')
-            }
-        
-        cat_stats = stats['por_categoria'][category]
-        cat_stats['total'] += amount
-        cat_stats['count'] += 1
-        cat_stats['maior'] = max(cat_stats['maior'], amount)
-        cat_stats['menor'] = min(cat_stats['menor'], amount)
-        cat_stats['media'] = cat_stats['total'] / cat_stats['count']
-        
-        # Atualiza totais por mês
-        if date not in stats['por_mes']:
-            stats['por_mes'][date] = {
-                'creditos': 0,
-                'debitos': 0,
-                'saldo': 0
-            }
-        
-        if amount > 0:
-            stats['total_creditos'] += amount
-            stats['count_creditos'] += 1
-            stats['maior_credito'] = max(stats['maior_credito'], amount)
-            stats['por_mes'][date]['creditos'] += amount
-        else:
-            stats['total_debitos'] += abs(amount)
-            stats['count_debitos'] += 1
-            stats['maior_debito'] = max(stats['maior_debito'], abs(amount))
-            stats['por_mes'][date]['debitos'] += abs(amount)
-        
-        stats['por_mes'][date]['saldo'] = stats['por_mes'][date]['creditos'] - stats['por_mes'][date]['debitos']
-    
-    # Calcula médias
-    stats['media_creditos'] = stats['total_creditos'] / stats['count_creditos'] if stats['count_creditos'] > 0 else 0
-    stats['media_debitos'] = stats['total_debitos'] / stats['count_debitos'] if stats['count_debitos'] > 0 else 0
-    
-    return stats
+    return analyze(transactions)
+
+def build_result(statement, transactions, transaction_filter=None, statistics=True, require_transactions=True):
+    """
+    Categoriza as transações (lista ou gerador) e monta o OFXParseResult.
+    Se `transaction_filter` for informado, só as transações aceitas pelo predicado
+    ficam em `transactions`. Com `statistics=False` a passada de análise é pulada
+    e o resultado fica sem estatísticas.
+    """
+    kept = []
+    transaction_count = 0
+
+    def collect(stream):
+        nonlocal transaction_count
+        for transaction in stream:
+            transaction_count += 1
+            if transaction_filter is None or transaction_filter(transaction):
+                kept.append(transaction)
+            yield transaction
+
+    stream = collect(categorize_transactions(transactions))
+    if statistics:
+        statistics = analyze_transactions(stream)
+    else:
+        statistics = None
+        for _ in stream:
+            pass
+    validate_statement(statement, transaction_count, require_transactions)
+
+    return OFXParseResult(
+        account=OFXAccount(
+            bank=statement['bank_id'],
+            account_number=statement['account_id'],
+            type=statement['account_type']
+        ),
+        period=build_period(statement['period']),
+        balance=build_balance(statement['balance']),
+        transactions=kept,
+        statistics=statistics,
+        transaction_count=transaction_count
+    )
+
+def load_or_parse_statements(raw, store, engine=None):
+    """
+    Retorna os extratos normalizados do conteúdo bruto, buscando-os no store pelo SHA-256
+    e processando (e gravando) o arquivo só quando ele ainda não foi visto.
+    """
+    digest = content_hash(raw)
+    statements = load_statements(store, digest)
+    if statements is not None:
+        print(f"Extrato {digest} encontrado no store de extratos processados")
+        return statements
+
+    statements = parse_ofx_content(raw, engine)
+    save_statements(store, digest, statements)
+    return statements
+
+def parse_ofx_statements(source, engine=None, transaction_filter=None, store=None, statistics=True):
+    """
+    Ponto de entrada do parser para arquivos com vários extratos (exportação consolidada
+    com contas correntes e cartões de crédito). Aceita as mesmas entradas de parse_ofx;
+    um objeto com read() é lido por inteiro, para que os extratos sejam separados.
+    Retorna um OFXParseResult por extrato, na ordem do arquivo.
+    """
+    raw = source.read() if hasattr(source, 'read') else source
+    if store is not None:
+        statements = load_or_parse_statements(raw, store, engine)
+    else:
+        statements = parse_ofx_content(raw, engine)
+    return build_results(statements, transaction_filter, statistics)
+
+def build_results(statements, transaction_filter=None, statistics=True):
+    """
+    Monta um OFXParseResult por extrato normalizado de um arquivo (ver parse_ofx_content).
+    """
+    require_transactions = len(statements) == 1
+    return [
+        build_result(statement, statement['transactions'], transaction_filter, statistics, require_transactions)
+        for statement in statements
+    ]
+
+def parse_ofx(source, engine=None, transaction_filter=None, store=None, statistics=True):
+    """
+    Ponto de entrada do parser como biblioteca.
+    `source` pode ser o conteúdo OFX (str ou bytes) ou um objeto com read() (arquivo ou
+    StreamingBody), lido em streaming. Bytes são tokenizados sem decodificar o documento:
+    só os valores extraídos são decodificados, com o charset declarado no cabeçalho.
+    Com `store` (ver object_store), o extrato normalizado é reaproveitado para conteúdos
+    idênticos, identificados pelo SHA-256; nesse caso o objeto é lido por inteiro, sem streaming.
+    As estatísticas só são calculadas com `statistics=True`.
+    Em arquivos com vários extratos, retorna o primeiro (ver parse_ofx_statements).
+    Retorna um OFXParseResult e lança ValueError se o extrato for inválido.
+    """
+    if store is not None:
+        # O SHA-256 decide se o parsing é necessário: o conteúdo é lido por inteiro antes
+        raw = source.read() if hasattr(source, 'read') else source
+        statements = load_or_parse_statements(raw, store, engine)
+        return build_result(statements[0], statements[0]['transactions'], transaction_filter, statistics)
+
+    if hasattr(source, 'read'):
+        statement = {}
+        return build_result(statement, stream_transactions(source, statement), transaction_filter, statistics)
+
+    encoding = None if isinstance(source, str) else detect_encoding(source)
+    statement = parse_statement_block((split_statements(source)[0], encoding, resolve_engine(engine)))
+    return build_result(statement, statement['transactions'], transaction_filter, statistics)
+
+def content_preview(content):
+    """
+    Primeiros 100 caracteres do conteúdo, para o log e o debug.
+    """
+    if isinstance(content, str):
+        return content[:100]
+    return decode_value(bytes(content[:100]), detect_encoding(content))
+
+def parse_include(value):
+    """
+    Converte o parâmetro include (ex.: 'statistics,debug') no conjunto de seções pedidas.
+    """
+    return {part.strip() for part in (value or '').split(',') if part.strip()}
 
 def handler(event, context):
     """
     Função principal do Lambda que processa arquivos OFX.
+    O motor de parsing pode ser escolhido via query string (?engine=regex|tokens).
+    Estatísticas e debug só são incluídos sob demanda (?include=statistics,debug).
+    Arquivos com vários extratos (contas e cartões) retornam um resultado por conta em 'statements'.
     """
     try:
         # Obtém o conteúdo OFX do corpo da requisição
         if not event:
             raise ValueError("Evento vazio")
 
+        # Motor de parsing e seções opcionais via query string (?engine=tokens&include=statistics)
+        engine = None
+        include = set()
+        if isinstance(event, dict):
+            params = event.get('queryStringParameters') or {}
+            engine = params.get('engine')
+            include = parse_include(params.get('include'))
+
         # Debug do evento recebido
         print(f"Evento recebido: {json.dumps(event)[:200]}")
 
@@ -296,91 +639,48 @@ def handler(event, context):
         if not ofx_content:
             raise ValueError("Nenhum conteúdo OFX fornecido")
 
-        # Debug do conteúdo OFX
-        print(f"Primeiros 100 caracteres do conteúdo OFX: {ofx_content[:100]}")
-
-        # Lida com quebras de linha escapadas substituindo-as por quebras de linha reais
-        ofx_content = ofx_content.replace('\\n', '\n')
-
-        # Extrai informações da conta da seção BANKACCTFROM
-        bank_id = extract_tag_content(ofx_content, 'BANKID')
-        account_id = extract_tag_content(ofx_content, 'ACCTID')
-        account_type = extract_tag_content(ofx_content, 'ACCTTYPE')
-
-        if not all([bank_id, account_id, account_type]):
-            print(f"Informações da conta incompletas: bank_id={bank_id}, account_id={account_id}, account_type={account_type}")
-            raise ValueError("Informações da conta não encontradas no arquivo OFX")
+        # Corpo binário (isBase64Encoded) é tokenizado direto dos bytes, com o charset do cabeçalho
+        if isinstance(event, dict) and event.get('isBase64Encoded'):
+            ofx_content = base64.b64decode(ofx_content)
 
-        # Debug: Imprime informações da conta extraídas
-        print(f"ID do Banco: {bank_id}")
-        print(f"ID da Conta: {account_id}")
-        print(f"Tipo da Conta: {account_type}")
-
-        # Extrai informações do período da seção BANKTRANLIST
-        banktranlist = extract_parent_tag_content(ofx_content, 'BANKTRANLIST')
-        if not banktranlist:
-            raise ValueError("Seção BANKTRANLIST não encontrada no arquivo OFX")
-
-        start_date = extract_tag_content(banktranlist, 'DTSTART')
-        end_date = extract_tag_content(banktranlist, 'DTEND')
-
-        # Debug: Imprime informações do período extraídas
-        print(f"Data Inicial: {start_date}")
-        print(f"Data Final: {end_date}")
-
-        # Extrai informações do saldo da seção LEDGERBAL
-        ledgerbal = extract_parent_tag_content(ofx_content, 'LEDGERBAL')
-        if not ledgerbal:
-            raise ValueError("Seção LEDGERBAL não encontrada no arquivo OFX")
-
-        balance_amount = extract_tag_content(ledgerbal, 'BALAMT')
-        balance_date = extract_tag_content(ledgerbal, 'DTASOF')
-
-        # Debug: Imprime informações do saldo extraídas
-        print(f"Valor do Saldo: {balance_amount}")
-        print(f"Data do Saldo: {balance_date}")
-
-        # Extrai todas as transações
-        transactions = extract_transactions(ofx_content)
-        if not transactions:
-            raise ValueError("Nenhuma transação encontrada no arquivo OFX")
-        
-        # Debug: Imprime número de transações encontradas
-        print(f"Número de transações encontradas: {len(transactions)}")
-
-        # Adiciona categoria sugerida
-        for transaction in transactions:
-            transaction['suggested_category'] = suggest_category(transaction)
-
-        # Realiza análise estatística
-        stats = analyze_transactions(transactions)
-
-        # Constrói a resposta
-        response = {
-            'account': {
-                'bank': bank_id,
-                'accountNumber': account_id,
-                'type': account_type
-            },
-            'period': {
-                'startDate': parse_ofx_date(start_date) if start_date else None,
-                'endDate': parse_ofx_date(end_date) if end_date else None
-            },
-            'transactions': transactions,
-            'balance': {
-                'amount': parse_ofx_amount(balance_amount) if balance_amount else None,
-                'date': parse_ofx_date(balance_date) if balance_date else None
-            },
-            'statistics': stats,
-            'debug': {
-                'transaction_count': len(transactions),
-                'bank_id_found': bank_id is not None,
-                'account_id_found': account_id is not None,
-                'balance_amount_found': balance_amount is not None,
+        # Debug do conteúdo OFX
+        print(f"Primeiros 100 caracteres do conteúdo OFX: {content_preview(ofx_content)}")
+
+        # Extrai conta, período, saldo, transações e estatísticas com o motor selecionado,
+        # reaproveitando o extrato normalizado se o mesmo arquivo já foi enviado
+        store = get_object_store() if PARSE_STORE_ENABLED else None
+        results = parse_ofx_statements(ofx_content, engine, store=store, statistics='statistics' in include)
+
+        # Debug: Imprime informações extraídas
+        print(f"Número de extratos encontrados: {len(results)}")
+        for result in results:
+            print(f"ID do Banco: {result.account.bank}")
+            print(f"ID da Conta: {result.account.account_number}")
+            print(f"Tipo da Conta: {result.account.type}")
+            print(f"Data Inicial: {result.period.start_date}")
+            print(f"Data Final: {result.period.end_date}")
+            print(f"Valor do Saldo: {result.balance.amount}")
+            print(f"Data do Saldo: {result.balance.date}")
+            print(f"Número de transações encontradas: {result.transaction_count}")
+
+        # Constrói a resposta: um extrato mantém o formato de sempre; vários vêm por conta
+        if len(results) == 1:
+            response = results[0].to_dict()
+        else:
+            response = {'statements': [result.to_dict() for result in results]}
+        if 'debug' in include:
+            response['debug'] = {
+                'statement_count': len(results),
+                'transaction_count': sum(result.transaction_count for result in results),
+                'bank_id_found': all(
+                    result.account.bank is not None or result.account.type == CREDIT_CARD_ACCOUNT_TYPE
+                    for result in results
+                ),
+                'account_id_found': all(result.account.account_number is not None for result in results),
+                'balance_amount_found': all(result.balance.amount is not None for result in results),
                 'content_length': len(ofx_content),
-                'first_chars': ofx_content[:100]
+                'first_chars': content_preview(ofx_content)
             }
-        }
 
         return {
             'statusCode': 200,
@@ -405,7 +705,7 @@ def handler(event, context):
         if 'ofx_content' in locals():
             error_response['debug'].update({
                 'content_length': len(ofx_content),
-                'first_chars': ofx_content[:100]
+                'first_chars': content_preview(ofx_content)
             })
         
         print(f"Erro: {json.dumps(error_response)}")
@@ -0,0 +1,248 @@
+import codecs
+import itertools
+import re
+
+# Um único padrão cobre tags de abertura, de fechamento e o texto que as segue
+TOKEN_PATTERN = re.compile(r'<(/?)([A-Za-z0-9_.]+)>([^<]*)')
+BYTES_TOKEN_PATTERN = re.compile(rb'<(/?)([A-Za-z0-9_.]+)>([^<]*)')
+
+# Seções do extrato cujos campos folha interessam ao parser
+SECTION_TAGS = ('BANKACCTFROM', 'CCACCTFROM', 'BANKTRANLIST', 'LEDGERBAL')
+
+# Extratos de conta corrente e de cartão de crédito; um arquivo consolidado traz vários
+STATEMENT_TAGS = ('STMTRS', 'CCSTMTRS')
+STATEMENT_PATTERN = re.compile(r'<(/?)(STMTRS|CCSTMTRS)>', re.IGNORECASE)
+BYTES_STATEMENT_PATTERN = re.compile(rb'<(/?)(STMTRS|CCSTMTRS)>', re.IGNORECASE)
+
+# Tamanho padrão dos blocos lidos de arquivos e StreamingBody
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Cabeçalho OFX: campos CHAVE:VALOR do SGML (antes do primeiro '<') ou a declaração XML
+HEADER_SCAN_SIZE = 4096
+HEADER_FIELD_PATTERN = re.compile(rb'([A-Za-z]+):([^\r\n\\]*)')
+XML_ENCODING_PATTERN = re.compile(rb'<\?xml[^>]*encoding=["\']([A-Za-z0-9_.:-]+)')
+
+# Sem charset declarado assume UTF-8; valores inválidos em UTF-8 são lidos como Windows-1252,
+# o charset da maioria dos extratos de bancos brasileiros
+DEFAULT_ENCODING = 'utf-8'
+FALLBACK_ENCODING = 'cp1252'
+
+# Quebra de linha escapada ('\\n' literal), comum no corpo enviado pelo API Gateway
+ESCAPED_NEWLINE = '\\n'
+
+
+def lookup_encoding(name):
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(head):
+    """
+    Codificação declarada no cabeçalho do OFX (bytes do início do documento):
+    encoding da declaração XML, ENCODING:UTF-8 ou CHARSET (1252, ISO-8859-1...) do SGML.
+    """
+    head = bytes(head[:HEADER_SCAN_SIZE])
+    match = XML_ENCODING_PATTERN.search(head)
+    if match:
+        return lookup_encoding(match.group(1).decode('ascii')) or DEFAULT_ENCODING
+
+    fields = {
+        key.decode('ascii').upper(): value.strip().decode('ascii', 'replace').upper()
+        for key, value in HEADER_FIELD_PATTERN.findall(head.split(b'<', 1)[0].replace(b'\\n', b'\n'))
+    }
+    if fields.get('ENCODING') in ('UTF-8', 'UNICODE'):
+        return DEFAULT_ENCODING
+    charset = fields.get('CHARSET', 'NONE')
+    if charset == 'NONE':
+        return DEFAULT_ENCODING
+    return lookup_encoding(f"cp{charset}" if charset.isdigit() else charset) or DEFAULT_ENCODING
+
+
+def decode_value(raw, encoding):
+    """
+    Decodifica um valor extraído. UTF-8 válido é lido como UTF-8 mesmo com outro charset
+    declarado (há arquivos CHARSET:1252 gravados em UTF-8, como events/sample.ofx);
+    os demais usam o charset declarado, ou Windows-1252 se o declarado for UTF-8.
+    """
+    try:
+        return raw.decode(DEFAULT_ENCODING)
+    except UnicodeDecodeError:
+        fallback = FALLBACK_ENCODING if encoding == DEFAULT_ENCODING else encoding
+        return raw.decode(fallback, 'replace')
+
+
+def clean_value(text, escaped_newline):
+    """
+    Remove espaços e quebras de linha escapadas em volta do valor.
+    """
+    value = text.strip()
+    while value.endswith(escaped_newline):
+        value = value[:-len(escaped_newline)].rstrip()
+    return value
+
+
+def iter_segment_events(segments, encoding=None):
+    """
+    Gera eventos ('start', tag, None), ('end', tag, None) e ('data', tag, valor)
+    para uma sequência de trechos OFX que só terminam em fronteira de tag.
+    Sem `encoding`, os trechos são texto; com ele, são bytes (ou memoryview) e só os
+    valores extraídos são decodificados.
+    No SGML as tags folha não têm fechamento; no XML o fechamento da folha é descartado.
+    """
+    if encoding is None:
+        pattern, escaped_newline = TOKEN_PATTERN, ESCAPED_NEWLINE
+    else:
+        pattern, escaped_newline = BYTES_TOKEN_PATTERN, ESCAPED_NEWLINE.encode('ascii')
+    tag_names = {}
+
+    last_leaf = None
+    for segment in segments:
+        for match in pattern.finditer(segment):
+            closing, raw_tag, text = match.groups()
+            tag = tag_names.get(raw_tag)
+            if tag is None:
+                tag = tag_names[raw_tag] = (raw_tag if encoding is None else raw_tag.decode('ascii')).upper()
+
+            if closing:
+                if tag == last_leaf:
+                    last_leaf = None
+                    continue
+                last_leaf = None
+                yield ('end', tag, None)
+                continue
+
+            value = clean_value(text, escaped_newline)
+            if value:
+                last_leaf = tag
+                yield ('data', tag, value if encoding is None else decode_value(value, encoding))
+            else:
+                last_leaf = None
+                yield ('start', tag, None)
+
+
+def iter_ofx_events(content, encoding=None):
+    """
+    Percorre o corpo OFX (SGML ou XML) uma única vez gerando o fluxo de eventos.
+    Conteúdo em bytes é tokenizado sem decodificar o documento inteiro, com o charset do cabeçalho
+    (ou `encoding`, para trechos sem cabeçalho, como os extratos de split_statements).
+    """
+    if isinstance(content, str):
+        return iter_segment_events([content])
+    return iter_segment_events([memoryview(content)], encoding or detect_encoding(content))
+
+
+def split_statements(content):
+    """
+    Separa o documento nos seus extratos (blocos STMTRS ou CCSTMTRS), na ordem do arquivo.
+    Os blocos de bytes são fatias de memoryview, sem cópia. Um documento sem esses blocos
+    é devolvido inteiro, como extrato único.
+    """
+    if isinstance(content, str):
+        pattern = STATEMENT_PATTERN
+    else:
+        pattern = BYTES_STATEMENT_PATTERN
+        content = memoryview(content)
+
+    blocks = []
+    start = None
+    for match in pattern.finditer(content):
+        if not match.group(1):
+            start = match.start()
+        elif start is not None:
+            blocks.append(content[start:match.end()])
+            start = None
+    # Bloco sem fechamento (arquivo truncado) vai até o fim do documento
+    if start is not None:
+        blocks.append(content[start:])
+    return blocks or [content]
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Lê blocos de um objeto com read() (arquivo ou StreamingBody do S3), sem decodificar.
+    """
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_stream_segments(chunks):
+    """
+    Reagrupa blocos arbitrários (texto ou bytes) em trechos que terminam antes do último '<',
+    de modo que nenhuma tag ou valor fique dividido entre dois trechos.
+    """
+    buffer = None
+    for chunk in chunks:
+        buffer = chunk if buffer is None else buffer + chunk
+        cut = buffer.rfind('<' if isinstance(buffer, str) else b'<')
+        if cut <= 0:
+            continue
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+    if buffer:
+        yield buffer
+
+
+def iter_stream_events(chunks):
+    """
+    Gera o fluxo de eventos a partir de blocos de texto ou bytes, com memória limitada ao bloco.
+    Para bytes, o charset vem do cabeçalho, lido no primeiro bloco.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return iter(())
+    encoding = None if isinstance(first, str) else detect_encoding(first)
+    return iter_segment_events(iter_stream_segments(itertools.chain([first], chunks)), encoding)
+
+
+def iter_statement_transactions(events, sections):
+    """
+    Gera cada STMTTRN ({TAG: valor}) assim que é fechado.
+    Os campos das seções do extrato são acumulados em `sections` ({SEÇÃO: {TAG: valor}});
+    apenas as seções encontradas aparecem no dicionário.
+    Só o primeiro extrato (STMTRS ou CCSTMTRS) é lido: a geração termina no seu fechamento.
+    """
+    stack = []
+    current = None
+
+    for kind, tag, value in events:
+        if kind == 'start':
+            stack.append(tag)
+            if tag == 'STMTTRN':
+                current = {}
+            elif tag in SECTION_TAGS:
+                sections.setdefault(tag, {})
+        elif kind == 'end':
+            # Fecha até a tag correspondente, tolerando aninhamento imperfeito do SGML
+            if tag not in stack:
+                continue
+            while stack:
+                popped = stack.pop()
+                if popped == 'STMTTRN' and current is not None:
+                    yield current
+                    current = None
+                if popped in STATEMENT_TAGS:
+                    return
+                if popped == tag:
+                    break
+        elif current is not None:
+            current.setdefault(tag, value)
+        elif stack and stack[-1] in sections:
+            sections[stack[-1]].setdefault(tag, value)
+
+
+def build_statement(events):
+    """
+    Monta o extrato a partir do fluxo de eventos.
+    Retorna {'sections': {SEÇÃO: {TAG: valor}}, 'transactions': [{TAG: valor}]}
+    com os valores brutos.
+    """
+    sections = {}
+    transactions = list(iter_statement_transactions(events, sections))
+    return {'sections': sections, 'transactions': transactions}
@@ -0,0 +1,59 @@
+import json
+
+from ingest_jobs import UPLOAD_URL_EXPIRES, create_job, incoming_key, is_job_id, load_job, new_job_id
+from object_store import get_object_store
+
+
+def json_response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps(body)
+    }
+
+
+def create_upload(store):
+    """
+    Cria o job e a URL assinada para o cliente enviar o OFX direto ao bucket (incoming/),
+    sem passar pelo API Gateway. O processamento acontece em segundo plano no ofx_ingest.
+    """
+    job_id = new_job_id()
+    job = create_job(store, job_id)
+    return json_response(201, {
+        'jobId': job_id,
+        'uploadUrl': store.presigned_put_url(incoming_key(job_id), UPLOAD_URL_EXPIRES),
+        'uploadMethod': 'PUT',
+        'expiresIn': UPLOAD_URL_EXPIRES,
+        'statusUrl': f"/ofx-uploads/{job_id}",
+        'status': job['status']
+    })
+
+
+def job_status(store, job_id):
+    """
+    Estado do job: pending, processing, done (com o resumo da ingestão), failed ou expired.
+    """
+    if not is_job_id(job_id):
+        return json_response(400, {'error': 'jobId inválido'})
+    job = load_job(store, job_id)
+    if job is None:
+        return json_response(404, {'error': 'Job não encontrado'})
+    return json_response(200, job)
+
+
+def handler(event, context):
+    """
+    POST /ofx-uploads cria um upload assíncrono; GET /ofx-uploads/{jobId} consulta o job.
+    """
+    try:
+        store = get_object_store()
+        job_id = (event.get('pathParameters') or {}).get('jobId')
+        if job_id is not None:
+            return job_status(store, job_id)
+        return create_upload(store)
+    except Exception as e:
+        print(f"Erro no upload de OFX: {str(e)}")
+        return json_response(500, {'error': str(e)})
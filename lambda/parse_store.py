@@ -0,0 +1,59 @@
+import gzip
+import hashlib
+import json
+
+from ofx_models import Transaction
+
+# Incrementar sempre que o formato normalizado do extrato mudar: as entradas antigas
+# ficam sob outro prefixo e deixam de ser lidas
+PARSE_SCHEMA_VERSION = 2
+PARSED_PREFIX = 'parsed'
+
+
+def content_hash(raw):
+    """
+    SHA-256 hexadecimal do conteúdo OFX bruto.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+def parsed_key(digest):
+    return f"{PARSED_PREFIX}/v{PARSE_SCHEMA_VERSION}/{digest}.json.gz"
+
+
+def load_statements(store, digest):
+    """
+    Retorna os extratos normalizados guardados para o hash (um por STMTRS/CCSTMTRS do arquivo),
+    ou None se não houver (ou se a entrada for de outra versão do schema ou estiver corrompida).
+    """
+    try:
+        data = store.get(parsed_key(digest))
+        if data is None:
+            return None
+        payload = json.loads(gzip.decompress(data).decode('utf-8'))
+        if payload.get('schema_version') != PARSE_SCHEMA_VERSION:
+            return None
+        statements = payload['statements']
+        for statement in statements:
+            statement['transactions'] = [Transaction.from_dict(t) for t in statement['transactions']]
+        return statements
+    except Exception as e:
+        print(f"Erro ao ler extrato processado {digest}: {str(e)}")
+        return None
+
+
+def save_statements(store, digest, statements):
+    """
+    Guarda os extratos normalizados (conta, período, saldo e transações) sob o hash.
+    Falhas são apenas registradas: o store é uma otimização.
+    """
+    try:
+        stored = [dict(statement, transactions=[t.to_dict() for t in statement['transactions']])
+                  for statement in statements]
+        payload = {'schema_version': PARSE_SCHEMA_VERSION, 'statements': stored}
+        data = gzip.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        store.put(parsed_key(digest), data, content_type='application/gzip')
+    except Exception as e:
+        print(f"Erro ao gravar extrato processado {digest}: {str(e)}")
@@ -0,0 +1,186 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional no pacote do Lambda
+    np = None
+
+from money import cents_array, to_reais
+
+# Abaixo disso o custo de montar os arrays supera o ganho da agregação vetorizada
+NUMPY_MIN_ROWS = 256
+
+DEFAULT_CATEGORY = 'Não Categorizado'
+
+
+def build_columns(transactions):
+    """
+    Converte as transações (ofx_models.Transaction) em colunas: valores em centavos
+    (array('q')) e códigos inteiros de mês e categoria, atribuídos na ordem em que aparecem.
+    Retorna (valores, códigos de mês, meses, códigos de categoria, categorias).
+    """
+    amounts = cents_array()
+    month_codes = []
+    category_codes = []
+    months = {}
+    categories = {}
+
+    for transaction in transactions:
+        amounts.append(transaction.amount_cents or 0)
+        month = (transaction.date_posted or '')[:7]
+        category = transaction.suggested_category or DEFAULT_CATEGORY
+        month_codes.append(months.setdefault(month, len(months)))
+        category_codes.append(categories.setdefault(category, len(categories)))
+
+    return amounts, month_codes, list(months), category_codes, list(categories)
+
+
+def empty_statistics():
+    return {
+        'total_creditos': 0,
+        'total_debitos': 0,
+        'count_creditos': 0,
+        'count_debitos': 0,
+        'maior_credito': 0,
+        'maior_debito': 0,
+        'por_categoria': {},
+        'por_mes': {}
+    }
+
+
+def finish_statistics(stats):
+    """
+    Converte os valores acumulados em centavos para reais e calcula as médias.
+    """
+    for field in ('total_creditos', 'total_debitos', 'maior_credito', 'maior_debito'):
+        stats[field] = to_reais(stats[field])
+    for cat_stats in stats['por_categoria'].values():
+        for field in ('total', 'media', 'maior', 'menor'):
+            cat_stats[field] = to_reais(cat_stats[field])
+    for month_stats in stats['por_mes'].values():
+        for field in ('creditos', 'debitos', 'saldo'):
+            month_stats[field] = to_reais(month_stats[field])
+
+    stats['media_creditos'] = stats['total_creditos'] / stats['count_creditos'] if stats['count_creditos'] > 0 else 0
+    stats['media_debitos'] = stats['total_debitos'] / stats['count_debitos'] if stats['count_debitos'] > 0 else 0
+    return stats
+
+
+def category_statistics(total, count, largest, smallest):
+    return {
+        'total': total,
+        'count': count,
+        'media': total / count,
+        'maior': largest,
+        'menor': smallest
+    }
+
+
+def month_statistics(credits, debits):
+    return {
+        'creditos': credits,
+        'debitos': debits,
+        'saldo': credits - debits
+    }
+
+
+def analyze_python(amounts, month_codes, months, category_codes, categories):
+    """
+    Agregação em uma passada em Python puro, usada quando o NumPy não está disponível.
+    Soma inteiros (centavos), sem erro de arredondamento acumulado.
+    """
+    stats = empty_statistics()
+    cat_totals = [0] * len(categories)
+    cat_counts = [0] * len(categories)
+    cat_max = [0] * len(categories)
+    cat_min = [None] * len(categories)
+    month_credits = [0] * len(months)
+    month_debits = [0] * len(months)
+
+    for amount, month, category in zip(amounts, month_codes, category_codes):
+        cat_totals[category] += amount
+        cat_counts[category] += 1
+        if amount > cat_max[category]:
+            cat_max[category] = amount
+        if cat_min[category] is None or amount < cat_min[category]:
+            cat_min[category] = amount
+
+        if amount > 0:
+            stats['total_creditos'] += amount
+            stats['count_creditos'] += 1
+            stats['maior_credito'] = max(stats['maior_credito'], amount)
+            month_credits[month] += amount
+        else:
+            stats['total_debitos'] -= amount
+            stats['count_debitos'] += 1
+            stats['maior_debito'] = max(stats['maior_debito'], -amount)
+            month_debits[month] -= amount
+
+    for code, category in enumerate(categories):
+        stats['por_categoria'][category] = category_statistics(
+            cat_totals[code], cat_counts[code], cat_max[code], cat_min[code]
+        )
+
+    for code, month in enumerate(months):
+        stats['por_mes'][month] = month_statistics(month_credits[code], month_debits[code])
+
+    return finish_statistics(stats)
+
+
+def analyze_numpy(amounts, month_codes, months, category_codes, categories):
+    """
+    Agregação vetorizada sobre os centavos em int64: somas e contagens com np.bincount
+    e extremos com np.maximum.at/np.minimum.at, agrupados pelos códigos de mês e categoria.
+    bincount soma em float64, exato para inteiros até 2**53 centavos.
+    """
+    stats = empty_statistics()
+    values = np.frombuffer(amounts, dtype=np.int64) if len(amounts) else np.zeros(0, dtype=np.int64)
+    month_idx = np.asarray(month_codes, dtype=np.int64)
+    category_idx = np.asarray(category_codes, dtype=np.int64)
+
+    def sums(codes, weights, length):
+        return np.rint(np.bincount(codes, weights=weights, minlength=length)).astype(np.int64)
+
+    credit = values > 0
+    debit_values = -values[~credit]
+    credit_values = values[credit]
+
+    stats['total_creditos'] = int(credit_values.sum())
+    stats['total_debitos'] = int(debit_values.sum())
+    stats['count_creditos'] = int(len(credit_values))
+    stats['count_debitos'] = int(len(debit_values))
+    stats['maior_credito'] = max(0, int(credit_values.max())) if len(credit_values) else 0
+    stats['maior_debito'] = max(0, int(debit_values.max())) if len(debit_values) else 0
+
+    n_categories = len(categories)
+    cat_totals = sums(category_idx, values, n_categories)
+    cat_counts = np.bincount(category_idx, minlength=n_categories)
+    cat_max = np.zeros(n_categories, dtype=np.int64)
+    np.maximum.at(cat_max, category_idx, values)
+    cat_min = np.full(n_categories, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(cat_min, category_idx, values)
+
+    n_months = len(months)
+    month_credits = sums(month_idx[credit], credit_values, n_months)
+    month_debits = sums(month_idx[~credit], debit_values, n_months)
+
+    for code, category in enumerate(categories):
+        stats['por_categoria'][category] = category_statistics(
+            int(cat_totals[code]), int(cat_counts[code]), int(cat_max[code]), int(cat_min[code])
+        )
+
+    for code, month in enumerate(months):
+        stats['por_mes'][month] = month_statistics(int(month_credits[code]), int(month_debits[code]))
+
+    return finish_statistics(stats)
+
+
+def analyze(transactions, engine=None):
+    """
+    Calcula as estatísticas de analyze_transactions em formato colunar.
+    `engine` força 'numpy' ou 'python'; por padrão usa NumPy se disponível e o volume compensar.
+    """
+    columns = build_columns(transactions)
+    if engine is None:
+        engine = 'numpy' if np is not None and len(columns[0]) >= NUMPY_MIN_ROWS else 'python'
+    if engine == 'numpy':
+        return analyze_numpy(*columns)
+    return analyze_python(*columns)
@@ -0,0 +1,75 @@
+import bisect
+import time
+
+# Maior caractere possível: prefixo + PREFIX_END limita o intervalo de datas com o prefixo
+PREFIX_END = '\uffff'
+
+
+class TransactionIndex:
+    """
+    Índices sobre uma lista de transações para os filtros do /transactions:
+    datas ordenadas para busca binária por intervalo e índices invertidos por
+    categoria sugerida e tipo. Filtros combinados viram interseção de conjuntos.
+    A lista indexada não deve ser alterada depois de criado o índice.
+    """
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+
+        dated = sorted(
+            (t.date_posted, i) for i, t in enumerate(transactions) if t.date_posted
+        )
+        self.dates = [date for date, _ in dated]
+        self.positions = [i for _, i in dated]
+
+        self.by_category = {}
+        self.by_type = {}
+        for i, transaction in enumerate(transactions):
+            self.by_category.setdefault(transaction.suggested_category, set()).add(i)
+            self.by_type.setdefault(transaction.type, set()).add(i)
+
+    def date_range(self, start=None, end_prefix=None):
+        """
+        Posições das transações com data >= start e data <= qualquer data com prefixo end_prefix.
+        """
+        low = bisect.bisect_left(self.dates, start) if start else 0
+        high = bisect.bisect_left(self.dates, end_prefix + PREFIX_END) if end_prefix else len(self.dates)
+        return set(self.positions[low:high])
+
+    def query(self, month=None, category=None, type=None, date_from=None, date_to=None):
+        """
+        Retorna (transações, explain) para os filtros informados, na ordem original.
+        `month` é um prefixo de data (YYYY-MM); `date_from`/`date_to` são datas YYYY-MM-DD inclusivas.
+        """
+        started = time.perf_counter()
+        steps = []
+        candidates = []
+
+        if month:
+            candidates.append(('month', self.date_range(month, month)))
+        if date_from or date_to:
+            candidates.append(('date_range', self.date_range(date_from, date_to)))
+        if category:
+            candidates.append(('category', self.by_category.get(category, set())))
+        if type:
+            candidates.append(('type', self.by_type.get(type, set())))
+
+        if not candidates:
+            positions = range(len(self.transactions))
+        else:
+            # Intersecta a partir do menor conjunto
+            candidates.sort(key=lambda candidate: len(candidate[1]))
+            positions = None
+            for name, candidate in candidates:
+                positions = set(candidate) if positions is None else positions & candidate
+                steps.append({'filter': name, 'candidates': len(candidate), 'remaining': len(positions)})
+            positions = sorted(positions)
+
+        transactions = [self.transactions[i] for i in positions]
+        explain = {
+            'indexed': len(self.transactions),
+            'steps': steps,
+            'matched': len(transactions),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+        return transactions, explain
@@ -0,0 +1,94 @@
+import gzip
+import json
+
+from ofx_models import Transaction
+
+TRANSACTIONS_PREFIX = 'transactions'
+LATEST_OFX_KEY = 'latest.ofx'
+
+# Aponta para a conta do último latest.ofx ingerido, com o ETag do arquivo, a versão do
+# categorizador, o período, o saldo e o intervalo de datas das transações dele
+LATEST_POINTER_KEY = f"{TRANSACTIONS_PREFIX}/latest.json"
+
+
+def account_key(account):
+    """
+    Identificador da conta usado nas chaves das partições: <banco>-<conta>, ou
+    <tipo>-<conta> para cartões de crédito, que não informam o banco.
+    """
+    return f"{account.bank or account.type}-{account.account_number}"
+
+
+def partition_key(account_id, month):
+    return f"{TRANSACTIONS_PREFIX}/{account_id}/{month}.jsonl.gz"
+
+
+def manifest_key(account_id):
+    return f"{TRANSACTIONS_PREFIX}/{account_id}/manifest.json"
+
+
+def group_by_month(transactions):
+    """
+    Agrupa as transações por mês (YYYY-MM) da data de lançamento.
+    """
+    months = {}
+    for transaction in transactions:
+        month = (transaction.date_posted or '')[:7]
+        if month:
+            months.setdefault(month, []).append(transaction)
+    return months
+
+
+def encode_partition(transactions):
+    lines = '\n'.join(json.dumps(t.to_dict(), separators=(',', ':')) for t in transactions)
+    return gzip.compress(lines.encode('utf-8'))
+
+
+def decode_partition(data):
+    return [Transaction.from_dict(json.loads(line)) for line in gzip.decompress(data).decode('utf-8').splitlines() if line]
+
+
+def load_manifest(store, account_id):
+    data = store.get(manifest_key(account_id))
+    return json.loads(data) if data else None
+
+
+def read_partitions(store, account_id, months):
+    """
+    Lê e concatena as transações dos meses informados, ignorando meses sem partição.
+    """
+    transactions = []
+    for month in months:
+        data = store.get(partition_key(account_id, month))
+        if data:
+            transactions.extend(decode_partition(data))
+    return transactions
+
+
+def load_latest_month(store, month, categorizer):
+    """
+    Retorna (ponteiro, transações do mês) do último latest.ofx ingerido, lidas da partição
+    da conta e restritas ao intervalo de datas do arquivo, para coincidir com o parsing do
+    latest.ofx inteiro. Retorna None se não houver partições, se o latest.ofx mudou depois
+    da ingestão (ETag) ou se as categorias gravadas são de outra versão do categorizador.
+    """
+    data = store.get(LATEST_POINTER_KEY)
+    if not data:
+        return None
+
+    pointer = json.loads(data)
+    if pointer.get('categorizer') != categorizer:
+        print(f"Partições categorizadas com {pointer.get('categorizer')}, categorizador atual {categorizer}")
+        return None
+    if not pointer.get('etag') or store.etag(LATEST_OFX_KEY) != pointer['etag']:
+        print("latest.ofx alterado depois da última ingestão")
+        return None
+    if load_manifest(store, pointer['account']) is None:
+        return None
+
+    first, last = pointer['range']
+    transactions = [
+        t for t in read_partitions(store, pointer['account'], [month])
+        if first <= (t.date_posted or '')[:10] <= last
+    ]
+    return pointer, transactions
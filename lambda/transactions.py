@@ -1,75 +1,168 @@
+import base64
+import bisect
 import json
-import boto3
-from datetime import datetime
-from ofx_parser import handler as ofx_parser
+from category_model import get_model
+from category_rules import get_rule_set
+from ledger import transaction_key
+from money import to_reais
+from object_store import get_object_store
+from ofx_cache import get_parsed_object
+from ofx_parser import PARSE_STORE_ENABLED, analyze_transactions, categorizer_version, parse_include, parse_ofx
+from transaction_index import TransactionIndex
+from transaction_partitions import LATEST_OFX_KEY, load_latest_month
 
-def get_latest_ofx_content():
+OFX_BUCKET = 'dindin-ofx-files'
+
+MAX_PAGE_SIZE = 500
+
+def get_latest_ofx_result():
     """
-    Busca o conteúdo OFX mais recente do S3.
+    Retorna (OFXParseResult, TransactionIndex) do extrato OFX mais recente do S3.
+    O resultado e seus índices ficam em cache no container e só são refeitos quando o
+    ETag do latest.ofx muda; mesmo então, um conteúdo já processado vem do store de extratos.
+    Retorna None se o arquivo não for encontrado.
     No futuro, isso pode ser parametrizado por conta/banco.
     """
+    print("Tentando buscar arquivo OFX do S3...")
+    object_store = get_object_store(OFX_BUCKET)
+    store = object_store if PARSE_STORE_ENABLED else None
+
+    def parse_and_index(body):
+        result = parse_ofx(body, store=store, statistics=False)
+        return result, TransactionIndex(result.transactions)
+
+    # As categorias dependem das regras e do modelo: outra versão invalida o cache
+    version = categorizer_version(get_rule_set(), get_model())
+    cached = get_parsed_object(object_store, LATEST_OFX_KEY, parse_and_index, variant=version)
+    if cached is None:
+        print("Arquivo latest.ofx não encontrado")
+    return cached
+
+def get_month_from_partitions(month):
+    """
+    Retorna (ponteiro, transações) do mês a partir das partições mensais do latest.ofx, ou
+    None se elas não existirem ou não corresponderem ao latest.ofx e ao categorizador atuais
+    (o arquivo é então processado por inteiro).
+    """
     try:
-        print("Tentando buscar arquivo OFX do S3...")
-        s3 = boto3.client('s3')
-        
-        # Lista os objetos para verificar se o arquivo existe
-        try:
-            s3.head_object(Bucket='dindin-ofx-files', Key='latest.ofx')
-        except Exception as e:
-            print(f"Arquivo latest.ofx não encontrado: {str(e)}")
-            return None
-            
-        response = s3.get_object(
-            Bucket='dindin-ofx-files',
-            Key='latest.ofx'
-        )
-        content = response['Body'].read().decode('utf-8')
-        print(f"Arquivo OFX obtido com sucesso. Tamanho: {len(content)} bytes")
-        return content
+        version = categorizer_version(get_rule_set(), get_model())
+        return load_latest_month(get_object_store(OFX_BUCKET), month, version)
     except Exception as e:
-        print(f"Erro ao buscar arquivo OFX: {str(e)}")
+        print(f"Erro ao ler partições do mês {month}: {str(e)}")
         return None
 
-def format_transaction_response(transactions, period, balance, statistics):
+def format_summary(transactions, period, balance):
+    """
+    Resumo do extrato: período, saldo e totais das transações informadas, somados em centavos.
+    """
+    total_credit = 0
+    total_debit = 0
+    for transaction in transactions:
+        amount = transaction.amount_cents or 0
+        if amount > 0:
+            total_credit += amount
+        else:
+            total_debit -= amount
+
+    return {
+        'period': period,
+        'balance': balance,
+        'total_transactions': len(transactions),
+        'total_credit': to_reais(total_credit),
+        'total_debit': to_reais(total_debit),
+        'net_balance': to_reais(total_credit - total_debit)
+    }
+
+def format_statistics(statistics):
+    """
+    Estatísticas por categoria e por mês, maiores transações e médias.
+    """
+    return {
+        'by_category': statistics['por_categoria'],
+        'by_month': statistics['por_mes'],
+        'largest_transactions': {
+            'credit': statistics['maior_credito'],
+            'debit': statistics['maior_debito']
+        },
+        'averages': {
+            'credit': statistics['media_creditos'],
+            'debit': statistics['media_debitos']
+        }
+    }
+
+def format_transaction_response(transactions, period, balance, statistics=None):
     """
     Formata a resposta da API com transações e informações adicionais.
+    As estatísticas só entram na resposta se forem informadas.
     """
     try:
         # Agrupa transações por mês
         transactions_by_month = {}
         for transaction in transactions:
-            month = transaction['date_posted'][:7]  # YYYY-MM
+            month = transaction.date_posted[:7]  # YYYY-MM
             if month not in transactions_by_month:
                 transactions_by_month[month] = []
-            transactions_by_month[month].append(transaction)
+            transactions_by_month[month].append(transaction.to_dict())
 
-        return {
-            'summary': {
-                'period': period,
-                'balance': balance,
-                'total_transactions': len(transactions),
-                'total_credit': statistics['total_creditos'],
-                'total_debit': statistics['total_debitos'],
-                'net_balance': statistics['total_creditos'] - statistics['total_debitos']
-            },
-            'transactions_by_month': transactions_by_month,
-            'statistics': {
-                'by_category': statistics['por_categoria'],
-                'by_month': statistics['por_mes'],
-                'largest_transactions': {
-                    'credit': statistics['maior_credito'],
-                    'debit': statistics['maior_debito']
-                },
-                'averages': {
-                    'credit': statistics['media_creditos'],
-                    'debit': statistics['media_debitos']
-                }
-            }
+        response = {
+            'summary': format_summary(transactions, period, balance),
+            'transactions_by_month': transactions_by_month
         }
+        if statistics is not None:
+            response['statistics'] = format_statistics(statistics)
+        return response
     except Exception as e:
         print(f"Erro ao formatar resposta: {str(e)}")
         raise
 
+def page_key(transaction):
+    """
+    Chave de ordenação estável das páginas: (date_posted, fitid), com a chave composta
+    do razão no lugar do fitid quando ele não existe.
+    """
+    return (transaction.date_posted or '', transaction_key(transaction))
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """
+    Decodifica o cursor opaco recebido na query string; lança ValueError se for inválido.
+    """
+    try:
+        date_posted, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Cursor inválido')
+    # A chave é comparada com as chaves (str, str) das transações: outros tipos não são cursores
+    if not isinstance(date_posted, str) or not isinstance(key, str):
+        raise ValueError('Cursor inválido')
+    return (date_posted, key)
+
+def paginate(transactions, limit, after=None):
+    """
+    Retorna (página, próximo cursor) com até `limit` transações posteriores a `after`
+    na ordem (date_posted, fitid). O próximo cursor é None na última página.
+    """
+    ordered = sorted(transactions, key=page_key)
+    keys = [page_key(t) for t in ordered]
+    start = bisect.bisect_right(keys, after) if after else 0
+    page = ordered[start:start + limit]
+
+    next_cursor = None
+    if start + limit < len(ordered):
+        next_cursor = encode_cursor(keys[start + limit - 1])
+    return page, next_cursor
+
+def bad_request(message):
+    return {
+        'statusCode': 400,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({'error': message})
+    }
+
 def handler(event, context):
     """
     Handler principal da API de transações.
@@ -77,6 +170,12 @@ def handler(event, context):
     - month: Filtra por mês específico (YYYY-MM)
     - category: Filtra por categoria
     - type: Filtra por tipo (CREDIT/DEBIT)
+    - from / to: Filtra por intervalo de datas (YYYY-MM-DD, inclusivo)
+    - explain: 'true' inclui no corpo o plano e o tempo da consulta aos índices
+    - limit / cursor: Paginação por cursor na ordem (date_posted, fitid); a página traz
+      só as transações e o next_cursor, sem resumo e estatísticas
+    - view: 'summary' retorna só o resumo e as estatísticas, sem as transações
+    - include: 'statistics' inclui as estatísticas, calculadas sobre as transações filtradas
     """
     try:
         print("Iniciando processamento da requisição...")
@@ -86,57 +185,117 @@ def handler(event, context):
         month_filter = params.get('month')
         category_filter = params.get('category')
         type_filter = params.get('type')
-        
-        print(f"Filtros recebidos: month={month_filter}, category={category_filter}, type={type_filter}")
-
-        # Busca dados OFX
-        ofx_content = get_latest_ofx_content()
-        if not ofx_content:
-            return {
-                'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Erro ao buscar dados OFX',
-                    'message': 'Arquivo OFX não encontrado ou inacessível no S3',
-                    'details': 'Verifique se o arquivo latest.ofx existe no bucket dindin-ofx-files'
-                })
-            }
+        date_from = params.get('from')
+        date_to = params.get('to')
+        explain_requested = params.get('explain') == 'true'
+        view = params.get('view')
+        include = parse_include(params.get('include'))
 
-        # Processa o arquivo OFX
-        print("Processando arquivo OFX...")
-        ofx_response = ofx_parser({'body': ofx_content}, None)
-        if ofx_response['statusCode'] != 200:
-            print(f"Erro ao processar OFX: {ofx_response['body']}")
-            return ofx_response
-
-        # Obtém os dados processados
-        ofx_data = json.loads(ofx_response['body'])
-        transactions = ofx_data['transactions']
-        print(f"Total de transações encontradas: {len(transactions)}")
+        # Valida os parâmetros de paginação antes de buscar os dados
+        limit = None
+        after = None
+        if params.get('limit') or params.get('cursor'):
+            try:
+                limit = int(params.get('limit') or MAX_PAGE_SIZE)
+            except ValueError:
+                return bad_request('Parâmetro limit deve ser um número inteiro')
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                return bad_request(f'Parâmetro limit deve estar entre 1 e {MAX_PAGE_SIZE}')
+            if params.get('cursor'):
+                try:
+                    after = decode_cursor(params['cursor'])
+                except ValueError as e:
+                    return bad_request(str(e))
         
-        # Aplica filtros
-        if month_filter:
-            transactions = [t for t in transactions if t['date_posted'].startswith(month_filter)]
-            print(f"Após filtro de mês: {len(transactions)} transações")
-            
-        if category_filter:
-            transactions = [t for t in transactions if t['suggested_category'] == category_filter]
-            print(f"Após filtro de categoria: {len(transactions)} transações")
-            
-        if type_filter:
-            transactions = [t for t in transactions if t['type'] == type_filter]
-            print(f"Após filtro de tipo: {len(transactions)} transações")
-
-        # Formata a resposta
-        response_data = format_transaction_response(
-            transactions=transactions,
-            period=ofx_data['period'],
-            balance=ofx_data['balance'],
-            statistics=ofx_data['statistics']
+        print(f"Filtros recebidos: month={month_filter}, category={category_filter}, type={type_filter}, "
+              f"from={date_from}, to={date_to}")
+
+        # Com filtro de mês, lê só a partição do mês gravada na ingestão do latest.ofx
+        partitioned = get_month_from_partitions(month_filter) if month_filter else None
+        if partitioned:
+            pointer, transactions = partitioned
+            index = TransactionIndex(transactions)
+            period = pointer['period']
+            balance = pointer['balance']
+            print(f"Mês {month_filter} lido das partições: {len(transactions)} transações")
+        else:
+            # Obtém o extrato processado (do cache do container quando o arquivo não mudou)
+            print("Processando arquivo OFX...")
+            try:
+                loaded = get_latest_ofx_result()
+            except ValueError as e:
+                print(f"Erro ao processar OFX: {str(e)}")
+                return {
+                    'statusCode': 500,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'error': 'Erro ao processar OFX',
+                        'message': 'Arquivo OFX inválido',
+                        'details': str(e)
+                    })
+                }
+
+            if not loaded:
+                return {
+                    'statusCode': 500,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'error': 'Erro ao buscar dados OFX',
+                        'message': 'Arquivo OFX não encontrado ou inacessível no S3',
+                        'details': 'Verifique se o arquivo latest.ofx existe no bucket dindin-ofx-files'
+                    })
+                }
+
+            result, index = loaded
+            period = result.period.to_dict()
+            balance = result.balance.to_dict()
+            print(f"Total de transações encontradas: {result.transaction_count}")
+
+        # Aplica os filtros como interseção dos índices
+        transactions, explain = index.query(
+            month=month_filter,
+            category=category_filter,
+            type=type_filter,
+            date_from=date_from,
+            date_to=date_to
         )
+        print(f"Consulta aos índices: {json.dumps(explain)}")
+
+        # Estatísticas só sob demanda, sobre as transações filtradas
+        statistics = None
+        if 'statistics' in include or view == 'summary':
+            statistics = analyze_transactions(transactions)
+
+        # Formata a resposta: página, resumo ou resposta completa
+        if limit:
+            page, next_cursor = paginate(transactions, limit, after)
+            response_data = {
+                'transactions': [transaction.to_dict() for transaction in page],
+                'next_cursor': next_cursor,
+                'total_transactions': len(transactions)
+            }
+            if statistics is not None:
+                response_data['statistics'] = format_statistics(statistics)
+        elif view == 'summary':
+            response_data = {
+                'summary': format_summary(transactions, period, balance),
+                'statistics': format_statistics(statistics)
+            }
+        else:
+            response_data = format_transaction_response(
+                transactions=transactions,
+                period=period,
+                balance=balance,
+                statistics=statistics
+            )
+        if explain_requested:
+            response_data['explain'] = explain
 
         print("Processamento concluído com sucesso")
         return {
@@ -1,12 +1,9 @@
 import json
-import boto3
-import os
+
+from account_store import AccountConflictError, get_account_store
+from account_validation import validate_account_changes
 
 def handler(event, context):
-    s3 = boto3.client('s3')
-    bucket = os.environ.get('ACCOUNTS_BUCKET', 'dindin-ofx-files')
-    key = 'accounts.json'
-    
     try:
         # Obtém o ID da conta da URL
         account_id = event.get('pathParameters', {}).get('id')
@@ -21,27 +18,21 @@ def handler(event, context):
         # Lê o corpo da requisição
         body = json.loads(event.get('body', '{}'))
         
-        # Valida o campo titular
-        if 'titular' in body:
-            titular = body['titular'].lower()
-            if titular not in ['ricardo', 'priscila']:
-                return {
-                    'statusCode': 400,
-                    'body': json.dumps({
-                        'error': 'Campo titular deve ser "ricardo" ou "priscila"'
-                    })
-                }
-            body['titular'] = titular
-        
-        # Lê o arquivo atual de contas
-        response = s3.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        data = json.loads(content)
-        accounts = data.get('accounts', [])
+        # Valida o titular e o saldo (em centavos exatos, sem float)
+        store = get_account_store()
+        try:
+            changes = validate_account_changes(body, store.titulares())
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'error': str(e)
+                })
+            }
         
-        # Procura a conta pelo ID
-        account_index = next((i for i, acc in enumerate(accounts) if acc['id'] == account_id), None)
-        if account_index is None:
+        # Atualiza os campos informados da conta, encontrada pelo ID
+        updated_account = store.update(account_id, changes)
+        if updated_account is None:
             return {
                 'statusCode': 404,
                 'body': json.dumps({
@@ -49,29 +40,6 @@ def handler(event, context):
                 })
             }
         
-        # Atualiza os campos da conta
-        current_account = accounts[account_index]
-        updated_account = {
-            'id': current_account['id'],  # Mantém o ID original
-            'name': body.get('name', current_account['name']),
-            'balance': float(body.get('balance', current_account['balance'])),
-            'category': body.get('category', current_account['category']),
-            'type': body.get('type', current_account['type']),
-            'icon': body.get('icon', current_account['icon']),
-            'titular': body.get('titular', current_account['titular'])
-        }
-        
-        # Atualiza a conta na lista
-        accounts[account_index] = updated_account
-        
-        # Atualiza o arquivo no S3
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=json.dumps({'accounts': accounts}, indent=2),
-            ContentType='application/json'
-        )
-        
         return {
             'statusCode': 200,
             'headers': {
@@ -81,6 +49,14 @@ def handler(event, context):
             'body': json.dumps(updated_account)
         }
         
+    except AccountConflictError as e:
+        return {
+            'statusCode': 409,
+            'body': json.dumps({
+                'error': 'Contas alteradas por outra requisição; tente novamente',
+                'details': str(e)
+            })
+        }
     except Exception as e:
         return {
             'statusCode': 500,
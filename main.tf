@@ -29,6 +29,7 @@ resource "aws_iam_role_policy" "lambda_s3_policy" {
         Action = [
           "s3:GetObject",
           "s3:PutObject",
+          "s3:DeleteObject",
           "s3:ListBucket"
         ]
         Resource = [
@@ -61,6 +62,12 @@ resource "aws_lambda_function" "accounts_api" {
   role          = aws_iam_role.lambda_exec.arn
   filename      = "${path.module}/lambda/accounts.zip"
   source_code_hash = filebase64sha256("${path.module}/lambda/accounts.zip")
+  environment {
+    variables = {
+      ACCOUNTS_BUCKET = "dindin-ofx-files"
+      ACCOUNT_STORE   = var.account_store
+    }
+  }
 }
 
 resource "aws_lambda_function" "transactions_api" {
@@ -111,6 +118,74 @@ resource "aws_lambda_function" "create_account_api" {
   environment {
     variables = {
       ACCOUNTS_BUCKET = "dindin-ofx-files"
+      ACCOUNT_STORE   = var.account_store
+    }
+  }
+}
+
+resource "aws_lambda_function" "accounts_batch_api" {
+  function_name = "accounts_batch_api"
+  handler       = "accounts_batch.handler"
+  runtime       = "python3.11"
+  role          = aws_iam_role.lambda_exec.arn
+  filename      = "${path.module}/lambda/accounts_batch.zip"
+  source_code_hash = filebase64sha256("${path.module}/lambda/accounts_batch.zip")
+  timeout       = 30
+  memory_size   = 128
+  environment {
+    variables = {
+      ACCOUNTS_BUCKET = "dindin-ofx-files"
+      ACCOUNT_STORE   = var.account_store
+    }
+  }
+}
+
+resource "aws_lambda_function" "accounts_compaction" {
+  function_name = "accounts_compaction"
+  handler       = "accounts_compaction.handler"
+  runtime       = "python3.11"
+  role          = aws_iam_role.lambda_exec.arn
+  filename      = "${path.module}/lambda/accounts_compaction.zip"
+  source_code_hash = filebase64sha256("${path.module}/lambda/accounts_compaction.zip")
+  timeout       = 60
+  memory_size   = 256
+  environment {
+    variables = {
+      ACCOUNTS_BUCKET            = "dindin-ofx-files"
+      ACCOUNTS_COMPACT_THRESHOLD = "50"
+      ACCOUNT_STORE              = var.account_store
+    }
+  }
+}
+
+resource "aws_lambda_function" "ofx_ingest" {
+  function_name = "ofx_ingest"
+  handler       = "ofx_ingest.handler"
+  runtime       = "python3.11"
+  role          = aws_iam_role.lambda_exec.arn
+  filename      = "${path.module}/lambda/ofx_ingest.zip"
+  source_code_hash = filebase64sha256("${path.module}/lambda/ofx_ingest.zip")
+  # Arquivos enviados por URL assinada não têm o limite de payload do API Gateway
+  timeout       = 300
+  memory_size   = 512
+  # O razão (partições mensais e manifesto da conta) é lido, alterado e regravado sem
+  # condição: uma execução por vez. Os eventos do S3 que chegam juntos esperam na fila
+  # de invocações assíncronas do Lambda, que as repete enquanto houver throttling
+  reserved_concurrent_executions = 1
+}
+
+resource "aws_lambda_function" "ofx_uploads_api" {
+  function_name = "ofx_uploads_api"
+  handler       = "ofx_uploads.handler"
+  runtime       = "python3.11"
+  role          = aws_iam_role.lambda_exec.arn
+  filename      = "${path.module}/lambda/ofx_uploads.zip"
+  source_code_hash = filebase64sha256("${path.module}/lambda/ofx_uploads.zip")
+  timeout       = 10
+  memory_size   = 128
+  environment {
+    variables = {
+      OFX_UPLOAD_URL_EXPIRES = "900"
     }
   }
 }
@@ -152,6 +227,14 @@ resource "aws_apigatewayv2_integration" "ofx_parser_integration" {
   payload_format_version = "2.0"
 }
 
+resource "aws_apigatewayv2_integration" "ofx_uploads_integration" {
+  api_id           = aws_apigatewayv2_api.dindin_api.id
+  integration_type = "AWS_PROXY"
+  integration_uri  = aws_lambda_function.ofx_uploads_api.invoke_arn
+  integration_method = "POST"
+  payload_format_version = "2.0"
+}
+
 resource "aws_apigatewayv2_integration" "investment_detail_integration" {
   api_id           = aws_apigatewayv2_api.dindin_api.id
   integration_type = "AWS_PROXY"
@@ -168,6 +251,14 @@ resource "aws_apigatewayv2_integration" "create_account_integration" {
   payload_format_version = "2.0"
 }
 
+resource "aws_apigatewayv2_integration" "accounts_batch_integration" {
+  api_id           = aws_apigatewayv2_api.dindin_api.id
+  integration_type = "AWS_PROXY"
+  integration_uri  = aws_lambda_function.accounts_batch_api.invoke_arn
+  integration_method = "POST"
+  payload_format_version = "2.0"
+}
+
 resource "aws_apigatewayv2_route" "default_route" {
   api_id    = aws_apigatewayv2_api.dindin_api.id
   route_key = "GET /"
@@ -192,6 +283,18 @@ resource "aws_apigatewayv2_route" "ofx_parser_route" {
   target    = "integrations/${aws_apigatewayv2_integration.ofx_parser_integration.id}"
 }
 
+resource "aws_apigatewayv2_route" "ofx_uploads_route" {
+  api_id    = aws_apigatewayv2_api.dindin_api.id
+  route_key = "POST /ofx-uploads"
+  target    = "integrations/${aws_apigatewayv2_integration.ofx_uploads_integration.id}"
+}
+
+resource "aws_apigatewayv2_route" "ofx_upload_status_route" {
+  api_id    = aws_apigatewayv2_api.dindin_api.id
+  route_key = "GET /ofx-uploads/{jobId}"
+  target    = "integrations/${aws_apigatewayv2_integration.ofx_uploads_integration.id}"
+}
+
 resource "aws_apigatewayv2_route" "investment_detail_route" {
   api_id    = aws_apigatewayv2_api.dindin_api.id
   route_key = "GET /investments/{investmentId}"
@@ -204,6 +307,12 @@ resource "aws_apigatewayv2_route" "create_account_route" {
   target    = "integrations/${aws_apigatewayv2_integration.create_account_integration.id}"
 }
 
+resource "aws_apigatewayv2_route" "accounts_batch_route" {
+  api_id    = aws_apigatewayv2_api.dindin_api.id
+  route_key = "POST /accounts/batch"
+  target    = "integrations/${aws_apigatewayv2_integration.accounts_batch_integration.id}"
+}
+
 resource "aws_apigatewayv2_stage" "default" {
   api_id      = aws_apigatewayv2_api.dindin_api.id
   name        = var.api_stage
@@ -242,6 +351,14 @@ resource "aws_lambda_permission" "allow_ofx_parser_api" {
   source_arn    = "${aws_apigatewayv2_api.dindin_api.execution_arn}/*/*"
 }
 
+resource "aws_lambda_permission" "allow_ofx_uploads_api" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ofx_uploads_api.arn
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.dindin_api.execution_arn}/*/*"
+}
+
 resource "aws_lambda_permission" "allow_investment_detail_api" {
   statement_id  = "AllowExecutionFromAPIGateway"
   action        = "lambda:InvokeFunction"
@@ -258,10 +375,70 @@ resource "aws_lambda_permission" "allow_create_account_api" {
   source_arn    = "${aws_apigatewayv2_api.dindin_api.execution_arn}/*/*"
 }
 
+resource "aws_lambda_permission" "allow_accounts_batch_api" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.accounts_batch_api.arn
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.dindin_api.execution_arn}/*/*"
+}
+
+resource "aws_lambda_permission" "allow_ofx_ingest_s3" {
+  statement_id  = "AllowExecutionFromS3"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ofx_ingest.arn
+  principal     = "s3.amazonaws.com"
+  source_arn    = data.aws_s3_bucket.ofx_files.arn
+}
+
+# Compacta o diário de contas periodicamente; o intervalo também é o tempo mínimo que um
+# registro incorporado ao snapshot continua no bucket antes de ser apagado
+resource "aws_cloudwatch_event_rule" "accounts_compaction" {
+  name                = "accounts_compaction"
+  schedule_expression = "rate(5 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "accounts_compaction" {
+  rule = aws_cloudwatch_event_rule.accounts_compaction.name
+  arn  = aws_lambda_function.accounts_compaction.arn
+}
+
+resource "aws_lambda_permission" "allow_accounts_compaction_schedule" {
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.accounts_compaction.arn
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.accounts_compaction.arn
+}
+
 data "aws_s3_bucket" "ofx_files" {
   bucket = "dindin-ofx-files"
 }
 
+resource "aws_s3_bucket_notification" "ofx_ingest" {
+  bucket = data.aws_s3_bucket.ofx_files.id
+
+  lambda_function {
+    lambda_function_arn = aws_lambda_function.ofx_ingest.arn
+    events              = ["s3:ObjectCreated:*"]
+    filter_suffix       = ".ofx"
+  }
+
+  depends_on = [aws_lambda_permission.allow_ofx_ingest_s3]
+}
+
+# O navegador envia o OFX direto ao bucket pela URL assinada do POST /ofx-uploads
+resource "aws_s3_bucket_cors_configuration" "ofx_files" {
+  bucket = data.aws_s3_bucket.ofx_files.id
+
+  cors_rule {
+    allowed_methods = ["PUT"]
+    allowed_origins = ["*"]
+    allowed_headers = ["*"]
+    max_age_seconds = 3000
+  }
+}
+
 resource "aws_s3_bucket_public_access_block" "ofx_files" {
   bucket = data.aws_s3_bucket.ofx_files.id
 
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from multiprocessing import Pool
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+from account_store import (ACCOUNTS_KEY, ACCOUNTS_MAX_ATTEMPTS, ACCOUNTS_RETRY_BASE_SECONDS,  # noqa: E402
+                           AccountConflictError, JournaledAccountStore, S3JsonAccountStore)
+from object_store import LocalObjectStore  # noqa: E402
+
+
+BACKENDS = {'journal': JournaledAccountStore, 's3': S3JsonAccountStore}
+
+
+def new_account(name):
+    return {
+        'id': str(uuid.uuid4()),
+        'name': name,
+        'balance': 0.0,
+        'category': 'Benchmark',
+        'type': 'conta',
+        'icon': 'banknote',
+        'titular': 'ricardo'
+    }
+
+
+class UnconditionalObjectStore(LocalObjectStore):
+    """
+    Store local que ignora as condições de escrita, como os PUTs sem If-Match de antes:
+    serve para medir as atualizações perdidas sem a concorrência otimista.
+    """
+
+    def put(self, key, data, content_type='application/octet-stream', if_match=None, if_none_match=None):
+        return super().put(key, data, content_type)
+
+
+def run_worker(task):
+    """
+    Cria `operations` contas em sequência, concorrendo com os demais processos pelo store.
+    Retorna (contas gravadas, conflitos, operações que esgotaram as tentativas).
+    """
+    root, worker, operations, backend, unconditional, max_attempts, retry_base = task
+    object_store = UnconditionalObjectStore(root) if unconditional else LocalObjectStore(root)
+    store = BACKENDS[backend](object_store, ACCOUNTS_KEY, max_attempts=max_attempts, retry_base_seconds=retry_base)
+
+    created = failed = 0
+    for i in range(operations):
+        try:
+            store.create(new_account(f"Benchmark {worker}-{i}"))
+            created += 1
+        except AccountConflictError:
+            failed += 1
+    return created, store.conflicts, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Mede vazão e atualizações perdidas com criações concorrentes de contas no store local'
+    )
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='journal',
+                        help='journal: um registro pequeno por alteração; s3: regrava o accounts.json inteiro')
+    parser.add_argument('--accounts', type=int, default=0, help='Contas já existentes antes da medição')
+    parser.add_argument('--workers', type=int, default=8, help='Processos escrevendo ao mesmo tempo')
+    parser.add_argument('--operations', type=int, default=50, help='Contas criadas por processo')
+    parser.add_argument('--max-attempts', type=int, default=ACCOUNTS_MAX_ATTEMPTS, help='Tentativas por alteração')
+    parser.add_argument('--retry-base', type=float, default=ACCOUNTS_RETRY_BASE_SECONDS,
+                        help='Espera base entre tentativas, em segundos (dobra a cada tentativa, com jitter)')
+    parser.add_argument('--unconditional', action='store_true',
+                        help='Grava sem If-Match/If-None-Match, para comparar com a escrita condicional')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        existing = [new_account(f"Existente {i}") for i in range(args.accounts)]
+        LocalObjectStore(root).put(ACCOUNTS_KEY, json.dumps({'accounts': existing}, indent=2))
+        tasks = [
+            (root, worker, args.operations, args.backend, args.unconditional, args.max_attempts, args.retry_base)
+            for worker in range(args.workers)
+        ]
+
+        started = time.perf_counter()
+        with Pool(args.workers) as pool:
+            results = pool.map(run_worker, tasks)
+        elapsed = time.perf_counter() - started
+
+        stored = len(BACKENDS[args.backend](LocalObjectStore(root), ACCOUNTS_KEY).list_accounts()) - args.accounts
+
+    created = sum(r[0] for r in results)
+    conflicts = sum(r[1] for r in results)
+    failed = sum(r[2] for r in results)
+    mode = 'sem condição' if args.unconditional else 'condicional'
+    print(f"{args.workers} processos x {args.operations} criações ({args.backend}, {mode}, "
+          f"{args.accounts} contas existentes) em {elapsed:.2f} s")
+    print(f"Vazão: {created / elapsed:.0f} alterações gravadas/s")
+    print(f"Conflitos (releituras): {conflicts}, {conflicts / max(created, 1):.2f} por alteração")
+    print(f"Tentativas esgotadas (409): {failed}")
+    print(f"Atualizações perdidas: {created - stored} (confirmadas {created}, no store {stored})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import ofx_parser  # noqa: E402
+from ofx_parser import (PARSER_ENGINES, analyze_transactions, categorize_transactions,  # noqa: E402
+                        parse_ofx_content, stream_transactions)
+
+DEFAULT_SOURCE = os.path.join(LAMBDA_DIR, 'events', 'latest.ofx')
+
+
+def build_statement(template, size):
+    """
+    Gera um extrato com `size` transações repetindo os STMTTRN do arquivo modelo.
+    """
+    blocks = re.findall(r'<STMTTRN>.*?</STMTTRN>', template, re.DOTALL)
+    start = template.index(blocks[0])
+    end = template.index(blocks[-1]) + len(blocks[-1])
+
+    repeated = [blocks[i % len(blocks)] for i in range(size)]
+    return template[:start] + '\n'.join(repeated) + template[end:]
+
+
+def build_consolidated(template, size, statements):
+    """
+    Gera um arquivo consolidado com `statements` extratos (contas distintas) e `size` transações no total.
+    """
+    single = build_statement(template, max(size // statements, 1))
+    match = re.search(r'<STMTRS>.*?</STMTRS>', single, re.DOTALL)
+    blocks = [match.group(0).replace('<ACCTID>', f'<ACCTID>{i}', 1) for i in range(statements)]
+    return single[:match.start()] + '\n'.join(blocks) + single[match.end():]
+
+
+def time_engine(content, engine, repeat):
+    """
+    Retorna o melhor tempo (em segundos) de `repeat` execuções do motor.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse_ofx_content(content, engine)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(func):
+    """
+    Executa `func` e retorna o pico de memória alocada (em MB) medido pelo tracemalloc.
+    """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def compare_memory(content):
+    """
+    Compara o pico de memória do parsing em memória com o do modo streaming,
+    ambos seguidos de categorização e estatísticas.
+    """
+    raw = content.encode('utf-8')
+
+    def in_memory():
+        statement = parse_ofx_content(raw, 'tokens')[0]
+        analyze_transactions(categorize_transactions(statement['transactions']))
+
+    def streaming():
+        analyze_transactions(categorize_transactions(stream_transactions(io.BytesIO(raw))))
+
+    return peak_memory(in_memory), peak_memory(streaming)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara os motores de parsing OFX')
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help='Arquivo OFX usado como modelo')
+    parser.add_argument('--sizes', default='1000,2000,4000,8000',
+                        help='Quantidades de transações separadas por vírgula')
+    parser.add_argument('--repeat', type=int, default=3, help='Execuções por medição')
+    parser.add_argument('--memory', action='store_true',
+                        help='Compara o pico de memória do parsing em memória e em streaming')
+    parser.add_argument('--statements', type=int, default=0,
+                        help='Compara o parsing em série e em paralelo de um arquivo com N extratos')
+    args = parser.parse_args()
+
+    with open(args.source, encoding='utf-8') as f:
+        template = f.read()
+
+    if args.statements:
+        print(f"Processos no pool: {ofx_parser.PARALLEL_WORKERS} (OFX_PARALLEL_WORKERS)")
+        print(f"{'transações':>12} {'extratos':>9} {'série (ms)':>11} {'paralelo (ms)':>14}")
+        for size in [int(s) for s in args.sizes.split(',')]:
+            content = build_consolidated(template, size, args.statements).encode('utf-8')
+            timings = []
+            for min_bytes in (len(content) + 1, 0):
+                ofx_parser.PARALLEL_MIN_BYTES = min_bytes
+                timings.append(time_engine(content, 'tokens', args.repeat))
+            print(f"{size:>12} {args.statements:>9} {timings[0] * 1000:>11.1f} {timings[1] * 1000:>14.1f}")
+        return
+
+    if args.memory:
+        print(f"{'transações':>12} {'em memória (MB)':>16} {'streaming (MB)':>15}")
+        for size in [int(s) for s in args.sizes.split(',')]:
+            in_memory, streaming = compare_memory(build_statement(template, size))
+            print(f"{size:>12} {in_memory:>16.1f} {streaming:>15.1f}")
+        return
+
+    print(f"{'transações':>12} {'motor':>8} {'total (ms)':>12} {'µs/transação':>14}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        # O Lambda recebe o arquivo em bytes: o motor 'regex' decodifica o documento, o 'tokens' não
+        content = build_statement(template, size).encode('utf-8')
+        for engine in PARSER_ENGINES:
+            elapsed = time_engine(content, engine, args.repeat)
+            print(f"{size:>12} {engine:>8} {elapsed * 1000:>12.1f} {elapsed / size * 1e6:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
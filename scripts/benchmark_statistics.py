@@ -0,0 +1,66 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import stats_engine  # noqa: E402
+from ofx_models import Transaction  # noqa: E402
+
+CATEGORIES = [
+    'Salário', 'Rendimentos', 'Transferência Recebida', 'Outras Receitas', 'Cartão de Crédito',
+    'Telefonia', 'Contas e Boletos', 'Transferência Enviada', 'Compras', 'Outras Despesas'
+]
+
+
+def generate_transactions(size, seed=42):
+    """
+    Gera transações sintéticas distribuídas em 36 meses e nas categorias padrão.
+    """
+    rng = random.Random(seed)
+    transactions = []
+    for _ in range(size):
+        year = rng.randint(2023, 2025)
+        month = rng.randint(1, 12)
+        transactions.append(Transaction(
+            amount_cents=rng.randint(-500000, 500000),
+            date_posted=f"{year}-{month:02d}-{rng.randint(1, 28):02d}T10:00:00",
+            suggested_category=rng.choice(CATEGORIES)
+        ))
+    return transactions
+
+
+def time_engine(transactions, engine, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        stats_engine.analyze(transactions, engine)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara os motores de agregação de estatísticas')
+    parser.add_argument('--sizes', default='10000,100000,500000',
+                        help='Quantidades de transações separadas por vírgula')
+    parser.add_argument('--repeat', type=int, default=3, help='Execuções por medição')
+    args = parser.parse_args()
+
+    engines = ['python'] + (['numpy'] if stats_engine.np is not None else [])
+    if stats_engine.np is None:
+        print("NumPy não instalado: medindo apenas o motor em Python puro")
+
+    print(f"{'transações':>12} {'motor':>8} {'total (ms)':>12} {'µs/transação':>14}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        transactions = generate_transactions(size)
+        for engine in engines:
+            elapsed = time_engine(transactions, engine, args.repeat)
+            print(f"{size:>12} {engine:>8} {elapsed * 1000:>12.1f} {elapsed / size * 1e6:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,21 @@
 import json
-import boto3
+import os
+import sys
 from datetime import datetime, timedelta
 import random
-import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+
+from account_store import (ACCOUNT_STORE_BACKEND, ACCOUNTS_BUCKET, ACCOUNTS_KEY,  # noqa: E402
+                           backfill_account_ids, get_account_store)
+from money import to_cents, to_reais  # noqa: E402
+from object_store import get_object_store  # noqa: E402
+
+def balance_share(account, fraction):
+    """
+    Fração do saldo da conta, calculada em centavos e arredondada para o centavo.
+    """
+    return to_reais(round(to_cents(account["balance"]) * fraction))
 
 def get_random_date(start_year=2020):
     start_date = datetime(start_year, 1, 1)
@@ -23,7 +36,7 @@ def generate_cdb_details(account):
         "purchase_date": purchase_date.strftime("%Y-%m-%d"),
         "maturity_date": maturity_date.strftime("%Y-%m-%d"),
         "rate": f"{rate:.2f}% do CDI",
-        "initial_investment": round(account["balance"] * 0.9, 2),
+        "initial_investment": balance_share(account, 0.9),
         "current_balance": account["balance"],
         "risk_level": "Baixo",
         "liquidity": "D+1" if "Liquidez" in account["name"] else "Vencimento",
@@ -94,7 +107,7 @@ def generate_pension_details(account):
         "plan_type": random.choice(["PGBL", "VGBL"]),
         "start_date": start_date.strftime("%Y-%m-%d"),
         "total_balance": account["balance"],
-        "monthly_contribution": round(account["balance"] * 0.02, 2),
+        "monthly_contribution": balance_share(account, 0.02),
         "tax_regime": random.choice(["Progressivo", "Regressivo"]),
         "portfolio_composition": {
             "Renda Fixa": f"{random.uniform(40, 80):.1f}%",
@@ -108,53 +121,44 @@ def generate_fgts_details(account):
         "account_name": account["name"],
         "account_id": account["id"],
         "total_balance": account["balance"],
-        "birthday_withdrawal": round(account["balance"] * 0.05, 2),
+        "birthday_withdrawal": balance_share(account, 0.05),
         "annual_yield": "TR + 3% a.a.",
         "next_withdrawal_date": (datetime.now() + timedelta(days=random.randint(30, 365))).strftime("%Y-%m-%d"),
         "employer": "Atual Empregador",
-        "available_for_withdrawal": round(account["balance"] * random.uniform(0.1, 0.3), 2)
+        "available_for_withdrawal": balance_share(account, random.uniform(0.1, 0.3))
     }
 
 def main():
-    # Configurar cliente S3
-    s3 = boto3.client('s3')
-    bucket_name = 'dindin-ofx-files'
-    
-    # Ler arquivo de contas
-    response = s3.get_object(Bucket=bucket_name, Key='accounts.json')
-    accounts_data = json.loads(response['Body'].read().decode('utf-8'))
-    
-    # Adicionar IDs para contas que não têm
-    updated = False
-    for account in accounts_data['accounts']:
-        if 'id' not in account:
-            account['id'] = str(uuid.uuid4())
-            updated = True
-    
-    # Se houve atualização, salvar o arquivo accounts.json atualizado
-    if updated:
-        s3.put_object(
-            Bucket=bucket_name,
-            Key='accounts.json',
-            Body=json.dumps(accounts_data, indent=2, ensure_ascii=False),
-            ContentType='application/json'
-        )
-        print("Updated accounts.json with new IDs")
+    # Bucket das contas e dos detalhes (LOCAL_OBJECT_STORE usa o store local)
+    store = get_object_store(ACCOUNTS_BUCKET)
+
+    # Contas sem ID só existem no accounts.json antigo, lido pelos backends journal e s3
+    # (no sharded, a migração já criou os IDs)
+    if ACCOUNT_STORE_BACKEND in ('journal', 's3'):
+        created = backfill_account_ids(store, ACCOUNTS_KEY)
+        if created:
+            print(f"Updated {ACCOUNTS_KEY} with {created} new IDs")
+
+    # Contas lidas pelo store (snapshot mais o diário pendente), como na API
+    accounts = get_account_store().list_accounts()
     
     # Limpar diretório investment_details
     try:
-        response = s3.list_objects_v2(Bucket=bucket_name, Prefix='investment_details/')
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                s3.delete_object(Bucket=bucket_name, Key=obj['Key'])
+        old_keys = list(store.list_keys('investment_details/'))
+        for key in old_keys:
+            store.delete(key)
+        if old_keys:
             print("Cleaned up old investment details")
     except Exception as e:
         print(f"Warning: Could not clean up old files: {e}")
     
     # Gerar detalhes para cada conta de investimento
-    for account in accounts_data['accounts']:
+    for account in accounts:
         if account['type'] != 'investimento':
             continue
+
+        # Saldo normalizado para centavos exatos: é o total_balance/current_balance dos detalhes
+        account['balance'] = to_reais(to_cents(account['balance']))
             
         details = None
         if account['category'] == 'CDBs':
@@ -173,12 +177,8 @@ def main():
         if details:
             # Salvar detalhes no S3 usando o ID como nome do arquivo
             file_name = f"investment_details/{account['id']}.json"
-            s3.put_object(
-                Bucket=bucket_name,
-                Key=file_name,
-                Body=json.dumps(details, indent=2, ensure_ascii=False),
-                ContentType='application/json'
-            )
+            store.put(file_name, json.dumps(details, indent=2, ensure_ascii=False),
+                      content_type='application/json')
             print(f"Generated details for: {account['name']} (ID: {account['id']})")
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import boto3
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import ofx_parser  # noqa: E402
+from ledger import merge_statement  # noqa: E402
+from object_store import LocalObjectStore, S3ObjectStore  # noqa: E402
+from ofx_parser import build_results, parse_ofx_content  # noqa: E402
+from parse_store import load_statements, save_statements  # noqa: E402
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def find_files(sources):
+    """
+    Expande diretórios (todos os .ofx, recursivamente) e globs na lista de arquivos, sem repetições.
+    """
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = glob.glob(os.path.join(source, '**', '*.ofx'), recursive=True)
+            matches += glob.glob(os.path.join(source, '**', '*.OFX'), recursive=True)
+        else:
+            matches = glob.glob(source, recursive=True)
+        paths.extend(sorted(path for path in matches if os.path.isfile(path)))
+    return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+
+def file_hash(path):
+    """
+    SHA-256 do arquivo, o mesmo de parse_store.content_hash sobre o conteúdo bruto.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def init_worker():
+    # Cada processo já processa um arquivo inteiro: sem pools aninhados para os extratos
+    ofx_parser.PARALLEL_WORKERS = 1
+
+
+def parse_file(task):
+    """
+    Lê e processa um arquivo OFX. Roda nos processos do pool.
+    Retorna (caminho, extratos normalizados, erro).
+    """
+    path, engine = task
+    try:
+        with open(path, 'rb') as f:
+            return path, parse_ofx_content(f.read(), engine), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def parse_files(paths, engine, workers):
+    """
+    Gera (caminho, extratos, erro) de cada arquivo, na ordem da lista, processando
+    em paralelo com `workers` processos (ou em série, se o pool não estiver disponível).
+    """
+    tasks = [(path, engine) for path in paths]
+    if workers > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                yield from pool.map(parse_file, tasks)
+            return
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            print(f"Pool de processos indisponível ({str(e)}); processando em série")
+
+    for task in tasks:
+        yield parse_file(task)
+
+
+def merge_in_order(store, pending):
+    """
+    Incorpora ao razão os extratos (resultado, SHA-256 do arquivo) em ordem de data final do
+    período, e não na ordem da linha de comando: em extratos sobrepostos, a versão do mais
+    recente prevalece. Empates mantêm a ordem recebida.
+    Retorna o total de transações novas no razão.
+    """
+    inserted = 0
+    for result, digest in sorted(pending, key=lambda item: item[0].period.end_date or ''):
+        inserted += merge_statement(store, result, source_hash=digest)['inserted']
+    return inserted
+
+
+def open_store(args):
+    if args.output:
+        return LocalObjectStore(args.output)
+    return S3ObjectStore(args.bucket, client=boto3.client('s3', endpoint_url=args.endpoint_url))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingere um lote de arquivos OFX no store de extratos e no razão')
+    parser.add_argument('sources', nargs='+', help='Diretórios (todos os .ofx) ou globs de arquivos OFX')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help='Diretório local no formato do bucket (como LOCAL_OBJECT_STORE/<bucket>)')
+    target.add_argument('--bucket', help='Bucket S3 de destino (ex.: dindin-ofx-files)')
+    parser.add_argument('--endpoint-url', help='Endpoint de um serviço compatível com S3 (ex.: MinIO)')
+    parser.add_argument('--engine', choices=sorted(ofx_parser.PARSER_ENGINES), help='Motor de parsing')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos de parsing')
+    parser.add_argument('--no-ledger', action='store_true',
+                        help='Só grava os extratos normalizados, sem incorporá-los ao razão das contas')
+    args = parser.parse_args()
+
+    paths = find_files(args.sources)
+    if not paths:
+        parser.error('Nenhum arquivo OFX encontrado')
+    store = open_store(args)
+    started = time.perf_counter()
+
+    # Deduplicação pelo SHA-256: cópias no lote são ignoradas e arquivos já processados
+    # vêm do store de extratos, sem novo parsing
+    digests = {}
+    seen = set()
+    duplicates = 0
+    for path in paths:
+        digest = file_hash(path)
+        if digest in seen:
+            duplicates += 1
+            print(f"{path}: duplicado, ignorado")
+            continue
+        seen.add(digest)
+        digests[path] = digest
+
+    statements_by_path = {}
+    to_parse = []
+    for path, digest in digests.items():
+        statements = load_statements(store, digest)
+        if statements is not None:
+            statements_by_path[path] = statements
+        else:
+            to_parse.append(path)
+    reused = len(statements_by_path)
+
+    errors = 0
+    for path, statements, error in parse_files(to_parse, args.engine, args.workers):
+        if error:
+            errors += 1
+            print(f"{path}: erro: {error}")
+            continue
+        save_statements(store, digests[path], statements)
+        statements_by_path[path] = statements
+    parsed_at = time.perf_counter()
+
+    transaction_count = 0
+    pending = []
+    for path in paths:
+        statements = statements_by_path.get(path)
+        if statements is None:
+            continue
+        results = build_results(statements, statistics=False)
+        transaction_count += sum(result.transaction_count for result in results)
+        pending.extend((result, digests[path]) for result in results)
+        print(f"{path}: {len(results)} extrato(s), {sum(r.transaction_count for r in results)} transações")
+    inserted = 0 if args.no_ledger else merge_in_order(store, pending)
+    elapsed = time.perf_counter() - started
+
+    files = len(statements_by_path)
+    size = sum(os.path.getsize(path) for path in statements_by_path) / (1024 * 1024)
+    print(f"\n{files} arquivos ({reused} já processados, {duplicates} duplicados, {errors} com erro), "
+          f"{transaction_count} transações, {inserted} novas no razão")
+    print(f"Parsing: {parsed_at - started:.2f} s; total: {elapsed:.2f} s com {args.workers} processos")
+    print(f"Vazão: {files / elapsed:.1f} arquivos/s, {transaction_count / elapsed:.0f} transações/s, "
+          f"{size / elapsed:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
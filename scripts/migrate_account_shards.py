@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import sys
+
+import boto3
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+from account_store import (ACCOUNT_TITULARES, ACCOUNTS_KEY, ACCOUNTS_MANIFEST_KEY, TITULAR_PATTERN,  # noqa: E402
+                           JournaledAccountStore, ShardedAccountStore, backfill_account_ids, shard_entry)
+from money import sum_reais  # noqa: E402
+from object_store import LocalObjectStore, PreconditionFailed, S3ObjectStore  # noqa: E402
+
+
+def open_store(args):
+    if args.output:
+        return LocalObjectStore(args.output)
+    return S3ObjectStore(args.bucket, client=boto3.client('s3', endpoint_url=args.endpoint_url))
+
+
+def pending_accounts(store):
+    """
+    Contas a migrar: o accounts.json com o diário pendente aplicado, como lido pelo backend
+    journal. Um accounts.json antigo com contas sem id não tem diário e é lido direto.
+    """
+    data = store.get(ACCOUNTS_KEY)
+    accounts = json.loads(data).get('accounts', []) if data else []
+    if all('id' in account for account in accounts):
+        return JournaledAccountStore(store, ACCOUNTS_KEY).list_accounts()
+    return accounts
+
+
+def invalid_accounts(accounts):
+    """
+    Contas (pelo id, ou pelo nome se não houver id) sem um titular que possa nomear um shard.
+    """
+    return [
+        str(account.get('id') or account.get('name'))
+        for account in accounts
+        if not isinstance(account.get('titular'), str) or not TITULAR_PATTERN.match(account['titular'])
+    ]
+
+
+def split_by_titular(accounts, titulares):
+    """
+    Agrupa as contas por titular, na ordem de `titulares` seguida dos titulares que só
+    aparecem nas contas.
+    """
+    shards = {titular: [] for titular in titulares}
+    for account in accounts:
+        shards.setdefault(account.get('titular'), []).append(account)
+    return shards
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Separa as contas do accounts.json (e do diário pendente) em shards por titular, com o manifesto'
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help='Diretório local no formato do bucket (como LOCAL_OBJECT_STORE/<bucket>)')
+    target.add_argument('--bucket', help='Bucket S3 (ex.: dindin-ofx-files)')
+    parser.add_argument('--endpoint-url', help='Endpoint de um serviço compatível com S3 (ex.: MinIO)')
+    parser.add_argument('--titular', action='append', default=[],
+                        help='Titular a cadastrar mesmo sem contas (pode ser repetido; padrão ACCOUNT_TITULARES)')
+    args = parser.parse_args()
+
+    store = open_store(args)
+    if store.get(ACCOUNTS_MANIFEST_KEY) is not None:
+        sharded = ShardedAccountStore(store)
+        for titular in args.titular:
+            if sharded.add_titular(titular):
+                print(f"Titular {titular} cadastrado no manifesto existente")
+        print(f"{ACCOUNTS_MANIFEST_KEY} já existe; contas já separadas por titular")
+        return
+
+    # Todas as contas são conferidas antes de qualquer gravação
+    accounts = pending_accounts(store)
+    invalid = invalid_accounts(accounts)
+    if invalid:
+        sys.exit(f"Contas sem titular válido: {', '.join(invalid)}; corrija as contas antes de migrar")
+    shards = split_by_titular(accounts, args.titular or ACCOUNT_TITULARES)
+    try:
+        entries_by_titular = {titular: shard_entry(titular) for titular in shards}
+    except ValueError as e:
+        sys.exit(f"{str(e)}; corrija os titulares antes de migrar")
+
+    # Contas antigas sem id ganham um antes da separação (os shards indexam pelo id)
+    created = backfill_account_ids(store, ACCOUNTS_KEY)
+    if created:
+        print(f"{created} contas sem id em {ACCOUNTS_KEY} receberam um id")
+        shards = split_by_titular(JournaledAccountStore(store, ACCOUNTS_KEY).list_accounts(),
+                                  args.titular or ACCOUNT_TITULARES)
+
+    entries = []
+    for titular, shard_accounts in shards.items():
+        entry = entries_by_titular[titular]
+        body = json.dumps({'accounts': shard_accounts, 'journalSeq': 0}, indent=2)
+        try:
+            store.put(entry['key'], body, content_type='application/json', if_none_match='*')
+        except PreconditionFailed:
+            sys.exit(f"{entry['key']} já existe: o backend sharded já está em uso sem manifesto")
+        entry.update(count=len(shard_accounts), balance=sum_reais(a.get('balance') or 0 for a in shard_accounts))
+        entries.append(entry)
+        print(f"{titular}: {entry['count']} contas, saldo {entry['balance']:.2f} -> {entry['key']}")
+
+    ShardedAccountStore(store).save_manifest({'shards': entries})
+    print(f"Manifesto gravado em {ACCOUNTS_MANIFEST_KEY} com {len(entries)} shards; "
+          f"o {ACCOUNTS_KEY} antigo foi mantido")
+
+
+if __name__ == '__main__':
+    main()
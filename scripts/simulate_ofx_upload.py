@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import ofx_ingest  # noqa: E402
+import ofx_uploads  # noqa: E402
+from ingest_jobs import STATUS_DONE, STATUS_EXPIRED, STATUS_FAILED  # noqa: E402
+from object_store import DEFAULT_BUCKET  # noqa: E402
+
+FINAL_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_EXPIRED)
+
+
+def call(handler, event):
+    response = handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def upload(url, data):
+    """
+    Envia o arquivo para a URL assinada. Com o store local, a URL file:// é o caminho do objeto.
+    """
+    if url.startswith('file://'):
+        path = urllib.parse.urlparse(url).path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return
+    request = urllib.request.Request(url, data=data, method='PUT')
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def s3_event(bucket, key):
+    """
+    Evento ObjectCreated do S3 como o recebido pelo ofx_ingest.
+    """
+    return {'Records': [{
+        'eventName': 'ObjectCreated:Put',
+        's3': {'bucket': {'name': bucket}, 'object': {'key': urllib.parse.quote_plus(key)}}
+    }]}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Simula o fluxo de upload assíncrono: URL assinada, upload, evento do S3 e consulta do job'
+    )
+    parser.add_argument('file', help='Arquivo OFX a enviar')
+    parser.add_argument('--local-root', default=os.environ.get('LOCAL_OBJECT_STORE'),
+                        help='Diretório do store local (LOCAL_OBJECT_STORE); sem ele, usa o S3 de verdade')
+    parser.add_argument('--timeout', type=float, default=60, help='Tempo máximo de espera pelo job, em segundos')
+    args = parser.parse_args()
+
+    if args.local_root:
+        os.environ['LOCAL_OBJECT_STORE'] = args.local_root
+
+    status, created = call(ofx_uploads.handler, {})
+    print(f"POST /ofx-uploads -> {status}: {json.dumps(created)}")
+
+    with open(args.file, 'rb') as f:
+        upload(created['uploadUrl'], f.read())
+    print(f"Arquivo enviado para {created['uploadUrl']}")
+
+    # Sem S3 não há notificação: o evento que o bucket enviaria é entregue ao ofx_ingest aqui
+    if args.local_root:
+        key = f"incoming/{created['jobId']}.ofx"
+        ofx_ingest.handler(s3_event(DEFAULT_BUCKET, key), None)
+
+    started = time.monotonic()
+    while True:
+        status, job = call(ofx_uploads.handler, {'pathParameters': {'jobId': created['jobId']}})
+        if job.get('status') in FINAL_STATUSES or time.monotonic() - started > args.timeout:
+            break
+        time.sleep(1)
+    print(f"GET {created['statusUrl']} -> {status}: {json.dumps(job, ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
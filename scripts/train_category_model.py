@@ -0,0 +1,118 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+from category_cache import category_key  # noqa: E402
+from category_model import (DEFAULT_BUCKETS, DEFAULT_MIN_CONFIDENCE, MODEL_PATH, NaiveBayesModel,  # noqa: E402
+                            feature_buckets, save_model)
+from ofx_models import Transaction  # noqa: E402
+
+
+def read_examples(paths):
+    """
+    Lê transações rotuladas (JSONL, uma por linha) com a categoria corrigida pelo usuário em
+    'category' e os campos da transação (memo, name, type, amount).
+    Retorna a lista de (chave do cache de categorias, categoria).
+    """
+    examples = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('category'):
+                    examples.append((category_key(Transaction.from_dict(record)), record['category']))
+    return examples
+
+
+def train(examples, buckets, alpha):
+    """
+    Naive Bayes multinomial com suavização de Laplace sobre os tokens com hashing.
+    Retorna (classes, log das probabilidades a priori, pesos [bucket][classe]).
+    """
+    classes = sorted({category for _, category in examples})
+    class_index = {category: i for i, category in enumerate(classes)}
+    n_classes = len(classes)
+
+    documents = [0] * n_classes
+    totals = [0] * n_classes
+    counts = [0] * (buckets * n_classes)
+    for (text, trntype, sign), category in examples:
+        c = class_index[category]
+        documents[c] += 1
+        for bucket in feature_buckets(text, trntype, sign, buckets):
+            counts[bucket * n_classes + c] += 1
+            totals[c] += 1
+
+    priors = [math.log(documents[c] / len(examples)) for c in range(n_classes)]
+    denominators = [math.log(totals[c] + alpha * buckets) for c in range(n_classes)]
+    weights = [
+        math.log(counts[b * n_classes + c] + alpha) - denominators[c]
+        for b in range(buckets) for c in range(n_classes)
+    ]
+    return classes, priors, weights
+
+
+def evaluate(model, examples):
+    """
+    Retorna (acurácia das previsões confiáveis, cobertura, µs por transação).
+    """
+    keys = [key for key, _ in examples]
+    started = time.perf_counter()
+    predictions = model.predict_batch(keys)
+    elapsed = time.perf_counter() - started
+
+    covered = [(predicted, category) for predicted, (_, category) in zip(predictions, examples) if predicted]
+    accuracy = sum(predicted == category for predicted, category in covered) / len(covered) if covered else 0
+    coverage = len(covered) / len(examples) if examples else 0
+    return accuracy, coverage, elapsed / max(len(examples), 1) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Treina o modelo Naive Bayes de categorização de transações')
+    parser.add_argument('labels', nargs='+', help='Arquivos JSONL com transações e a categoria corrigida')
+    parser.add_argument('--output', default=MODEL_PATH, help='Arquivo do modelo (padrão: lambda/category_model.bin)')
+    parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS, help='Tamanho do vocabulário com hashing')
+    parser.add_argument('--alpha', type=float, default=1.0, help='Suavização de Laplace')
+    parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help='Abaixo desta confiança a categoria vem das regras')
+    parser.add_argument('--holdout', type=float, default=0.2, help='Fração separada para validação')
+    args = parser.parse_args()
+
+    examples = read_examples(args.labels)
+    if not examples:
+        parser.error('Nenhuma transação rotulada encontrada')
+
+    random.Random(42).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout)) if args.holdout else len(examples)
+    header = {
+        'version': datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S'),
+        'buckets': args.buckets,
+        'min_confidence': args.min_confidence
+    }
+
+    if args.holdout and split < len(examples):
+        classes, priors, weights = train(examples[:split], args.buckets, args.alpha)
+        model = NaiveBayesModel(dict(header, classes=classes, priors=priors), weights)
+        accuracy, coverage, micros = evaluate(model, examples[split:])
+        print(f"Validação ({len(examples) - split} transações): acurácia {accuracy:.1%} "
+              f"em {coverage:.1%} previstas pelo modelo, {micros:.2f} µs/transação")
+
+    # O modelo final usa todas as transações rotuladas
+    classes, priors, weights = train(examples, args.buckets, args.alpha)
+    save_model(args.output, dict(header, classes=classes, priors=priors), weights)
+    print(f"Modelo {header['version']} gravado em {args.output}: {len(examples)} transações, "
+          f"{len(classes)} categorias, {os.path.getsize(args.output) / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
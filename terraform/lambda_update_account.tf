@@ -1,15 +1,17 @@
 resource "aws_lambda_function" "update_account" {
-  filename         = "update_account.zip"
+  filename         = "${path.module}/../lambda/update_account.zip"
+  source_code_hash = filebase64sha256("${path.module}/../lambda/update_account.zip")
   function_name    = "dindin-update-account"
   role            = aws_iam_role.lambda_role.arn
   handler         = "update_account.handler"
-  runtime         = "python3.9"
+  runtime         = "python3.11"
   timeout         = 30
   memory_size     = 128
 
   environment {
     variables = {
       ACCOUNTS_BUCKET = "dindin-ofx-files"
+      ACCOUNT_STORE   = var.account_store
     }
   }
 }
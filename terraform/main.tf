@@ -2,6 +2,12 @@ provider "aws" {
   region = "sa-east-1"
 }
 
+variable "account_store" {
+  description = "Backend das contas (ACCOUNT_STORE): journal até rodar scripts/migrate_account_shards.py, depois sharded"
+  type        = string
+  default     = "journal"
+}
+
 # API Gateway - Usando o gateway HTTP existente
 data "aws_apigatewayv2_api" "existing_api" {
   api_id = "50917j6yoa"
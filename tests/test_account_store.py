@@ -0,0 +1,25 @@
+import pytest
+
+from account_store import AccountStore, InMemoryAccountStore
+
+
+def test_incomplete_backend_fails_on_construction():
+    class ReadOnlyStore(AccountStore):
+        def list_accounts(self, titular=None):
+            return []
+
+        def get(self, account_id):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
+
+
+def test_in_memory_store_applies_batch():
+    store = InMemoryAccountStore([{'id': 'a', 'titular': 'ricardo', 'balance': 10}])
+    results = store.apply_batch([
+        {'op': 'update', 'id': 'a', 'changes': {'balance': 20}},
+        {'op': 'delete', 'id': 'b'}
+    ])
+    assert [result['status'] for result in results] == [200, 404]
+    assert store.get('a')['balance'] == 20
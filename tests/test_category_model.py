@@ -0,0 +1,31 @@
+import pytest
+
+import category_model
+from category_model import load_model, save_model
+
+HEADER = {'version': 'test', 'classes': ['A', 'B'], 'buckets': 4, 'priors': [0.0, 0.0]}
+
+
+def test_load_model_round_trip(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    save_model(path, HEADER, [float(i) for i in range(8)])
+    model = load_model(path)
+    assert list(model.weights) == [float(i) for i in range(8)]
+
+
+@pytest.mark.parametrize('numpy', [True, False])
+def test_load_model_rejects_truncated_file(tmp_path, monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(category_model, 'np', None)
+    path = tmp_path / 'model.bin'
+    save_model(str(path), HEADER, [0.0] * 8)
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(ValueError):
+        load_model(str(path))
+
+
+def test_load_model_rejects_other_files(tmp_path):
+    path = tmp_path / 'model.bin'
+    path.write_bytes(b'not a model')
+    with pytest.raises(ValueError):
+        load_model(str(path))
@@ -0,0 +1,14 @@
+from category_rules import load_default_rules
+from ofx_parser import build_transaction
+
+
+def test_categorize_matches_memo():
+    rule_set = load_default_rules()
+    transaction = build_transaction({'TRNTYPE': 'CREDIT', 'TRNAMT': '100.00', 'MEMO': 'Pix recebido'})
+    assert rule_set.categorize(transaction) == 'Transferência Recebida'
+
+
+def test_categorize_without_memo_ignores_name():
+    rule_set = load_default_rules()
+    transaction = build_transaction({'TRNTYPE': 'DEBIT', 'TRNAMT': '-50.00', 'NAME': 'COMPRA CARTAO'})
+    assert rule_set.categorize(transaction) == 'Outras Despesas'
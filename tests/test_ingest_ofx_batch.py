@@ -0,0 +1,47 @@
+import os
+import sys
+
+from object_store import LocalObjectStore
+from ofx_parser import parse_ofx
+from transaction_partitions import account_key, decode_partition, load_manifest, partition_key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import ingest_ofx_batch  # noqa: E402
+
+EVENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda', 'events')
+
+
+def newer_statement(content):
+    """
+    Extrato que se sobrepõe ao sample.ofx e termina depois dele, com o memo de uma
+    transação já conhecida corrigido.
+    """
+    return (content
+            .replace('<DTEND>20240320120000', '<DTEND>20240325120000')
+            .replace('<MEMO>Farmácia', '<MEMO>Farmacia Popular')
+            .replace('<DTASOF>20240320120000', '<DTASOF>20240325120000')
+            .replace('<BALAMT>4770.00', '<BALAMT>4700.00'))
+
+
+def test_overlapping_files_merge_by_statement_end(tmp_path, monkeypatch):
+    with open(os.path.join(EVENTS_DIR, 'sample.ofx'), encoding='utf-8') as f:
+        content = f.read()
+    older, newer = tmp_path / 'older.ofx', tmp_path / 'newer.ofx'
+    older.write_text(content, encoding='utf-8')
+    newer.write_text(newer_statement(content), encoding='utf-8')
+    output = tmp_path / 'bucket'
+
+    # Arquivo mais recente primeiro na linha de comando
+    monkeypatch.setattr(sys, 'argv', ['ingest_ofx_batch.py', str(newer), str(older),
+                                      '--output', str(output), '--workers', '1'])
+    ingest_ofx_batch.main()
+
+    store = LocalObjectStore(str(output))
+    account_id = account_key(parse_ofx(content).account)
+    ledger = decode_partition(store.get(partition_key(account_id, '2024-03')))
+    assert len(ledger) == 3
+    assert [t.memo for t in ledger if t.fitid == '2024031703'] == ['Farmacia Popular']
+    manifest = load_manifest(store, account_id)
+    assert manifest['period']['endDate'].startswith('2024-03-25')
+    assert manifest['balance']['amount'] == 4700.0
@@ -0,0 +1,41 @@
+import json
+import os
+import sys
+
+import pytest
+
+from account_store import ACCOUNTS_KEY, ACCOUNTS_MANIFEST_KEY
+from object_store import LocalObjectStore
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import migrate_account_shards  # noqa: E402
+
+
+def run_migration(monkeypatch, output, accounts):
+    store = LocalObjectStore(str(output))
+    store.put(ACCOUNTS_KEY, json.dumps({'accounts': accounts}))
+    monkeypatch.setattr(sys, 'argv', ['migrate_account_shards.py', '--output', str(output)])
+    migrate_account_shards.main()
+    return store
+
+
+def test_migration_splits_accounts_by_titular(tmp_path, monkeypatch):
+    store = run_migration(monkeypatch, tmp_path, [
+        {'id': 'a', 'titular': 'ricardo', 'balance': 10},
+        {'name': 'Poupança', 'titular': 'priscila', 'balance': 5}
+    ])
+    manifest = json.loads(store.get(ACCOUNTS_MANIFEST_KEY))
+    assert {shard['titular']: shard['count'] for shard in manifest['shards']} == {'ricardo': 1, 'priscila': 1}
+
+
+def test_migration_rejects_accounts_without_titular_before_writing(tmp_path, monkeypatch, capsys):
+    with pytest.raises(SystemExit) as exc:
+        run_migration(monkeypatch, tmp_path, [
+            {'id': 'a', 'titular': 'ricardo', 'balance': 10},
+            {'id': 'b', 'balance': 5},
+            {'name': 'Carteira', 'balance': 1}
+        ])
+    assert exc.value.code != 0
+    assert 'b, Carteira' in str(exc.value.code)
+    assert list(LocalObjectStore(str(tmp_path)).list_keys('')) == [ACCOUNTS_KEY]
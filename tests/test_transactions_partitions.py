@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+import ofx_ingest
+import transactions
+from object_store import get_object_store
+from transaction_partitions import LATEST_OFX_KEY, LATEST_POINTER_KEY
+
+EVENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda', 'events')
+MONTH = '2024-03'
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCAL_OBJECT_STORE', str(tmp_path))
+    store = get_object_store(transactions.OFX_BUCKET)
+    with open(os.path.join(EVENTS_DIR, 'sample.ofx'), 'rb') as f:
+        store.put(LATEST_OFX_KEY, f.read())
+    ofx_ingest.ingest_object(store, LATEST_OFX_KEY)
+    return store
+
+
+def month_response(params):
+    response = transactions.handler({'queryStringParameters': params}, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_month_partition_matches_full_parse(store, monkeypatch):
+    params = {'month': MONTH, 'include': 'statistics'}
+
+    # Com as partições válidas, o latest.ofx não é processado
+    def fail():
+        raise AssertionError('latest.ofx processado apesar das partições')
+    with monkeypatch.context() as patch:
+        patch.setattr(transactions, 'get_latest_ofx_result', fail)
+        from_partitions = month_response(params)
+
+    store.delete(LATEST_POINTER_KEY)
+    from_file = month_response(params)
+
+    assert from_partitions == from_file
+    assert from_partitions['summary']['total_transactions'] > 0
+
+    # O arquivo tem um só mês: sem o filtro, as transações são as mesmas
+    assert month_response({})['transactions_by_month'] == from_file['transactions_by_month']
+
+
+def test_partitions_ignored_after_categorizer_change(store, monkeypatch):
+    monkeypatch.setattr(transactions, 'categorizer_version', lambda rule_set, model: 'outra-versao')
+    monkeypatch.setattr(transactions, 'get_latest_ofx_result', lambda: None)
+
+    response = transactions.handler({'queryStringParameters': {'month': MONTH}}, None)
+
+    # Sem partições válidas, cai no latest.ofx (aqui indisponível)
+    assert response['statusCode'] == 500
+
+
+def test_partitions_ignored_after_latest_changes(store, monkeypatch):
+    store.put(LATEST_OFX_KEY, store.get(LATEST_OFX_KEY) + b'\n')
+    monkeypatch.setattr(transactions, 'get_latest_ofx_result', lambda: None)
+
+    response = transactions.handler({'queryStringParameters': {'month': MONTH}}, None)
+
+    assert response['statusCode'] == 500
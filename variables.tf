@@ -14,4 +14,10 @@ variable "api_stage" {
   description = "API Gateway stage name"
   type        = string
   default     = "dev"
-} 
\ No newline at end of file
+}
+
+variable "account_store" {
+  description = "Backend das contas (ACCOUNT_STORE): journal até rodar scripts/migrate_account_shards.py, depois sharded"
+  type        = string
+  default     = "journal"
+}